@@ -9,7 +9,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 import src.helper as helper
-import src.spectra as spectra
+from src.spectrum_cache import SpectrumCache
 
 # from src.mooring import Mooring
 # from src.location import Location
@@ -61,8 +61,14 @@ complex_velocity_array = helper.Data.cut_trailing_nans(
 
 #print(np.shape(complex_velocity_array))
 
-freq, velocity_spectrum = spectra.total_multitaper(
-    complex_velocity_array, dt=1 / 12, P=TIME_HALF_BANDWIDTH_PRODUCT
+# reuse the spectrum already computed by calculate_available_energy_levels.py
+spectrum_cache = SpectrumCache(cache_dir="../data/spectra_cache")
+freq, velocity_spectrum = spectrum_cache.total_multitaper(
+    complex_velocity_array,
+    location=mooring.location,
+    depth=measurement_depth,
+    dt=1 / 12,
+    P=TIME_HALF_BANDWIDTH_PRODUCT
 )
 assert not np.any(np.isnan(velocity_spectrum))
 
@@ -2,6 +2,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+import src.results_store as results_store
+
 
 def main():
     # ONE_COLUMN_WIDTH = 8.3
@@ -15,8 +17,10 @@ def main():
         "font.size": 9
     })
 
-    data = np.load("../scripts/IDEMIX_parameterization/method_results/results_available_energy.npz",
-                   allow_pickle=True)
+    data = results_store.read_results(
+        "../scripts/IDEMIX_parameterization/method_results/results_available_energy",
+        columns=["lat", "lon", "tidal_energies", "mab", "cats", "barotropic"]
+    )
     energy_levels = pd.DataFrame(data={
         "lat":data["lat"], 
         "lon":data["lon"], 
@@ -8,13 +8,17 @@ plt.rcParams.update({
 })
 
 import src.helper as helper
+import src.results_store as results_store
+from src.stratification import StratificationIndex
 import equations as eq
 
-N_table = pd.read_pickle("method_results/N_values.pkl")
-N_error_table = pd.read_pickle("method_results/N_std.pkl")
+stratification = StratificationIndex.from_pickles("method_results/N_values.pkl", "method_results/N_std.pkl")
 
 print("Load wave energy table")
-data = np.load("method_results/results_available_energy.npz", allow_pickle=True)
+data = results_store.read_results(
+    "method_results/results_available_energy",
+    columns=["lon", "lat", "depth", "mab", "barotropic", "continuum", "available_E", "E_Error"]
+)
 energy_levels = pd.DataFrame(data={
     "lon": data["lon"],
     "lat": data["lat"],
@@ -25,61 +29,35 @@ energy_levels = pd.DataFrame(data={
     "available E": data["available_E"],
     "E Error": data["E_Error"],
 })
-energy_levels["rounded depth"] = energy_levels["rounded depth"].astype("int")
 
 # Assign N and its error to each location, where the wave energy level is know
 print("Add N values")
-N_array = []
-N_error_array = []
-for index, row in energy_levels.iterrows():
-    column_name = f"({row['lat']:.2f},{row['lon']:.2f})"
-    # print(column_name)
-    try:
-        N_value = N_table.loc[N_table['mab'] == row["rounded mab"], column_name].item()
-        N_error = N_error_table.loc[N_error_table['mab'] == row["rounded mab"], column_name].item()
-        assert N_value**2 > 1e-9
-    except ValueError:
-        N_value = np.nan
-        N_error = np.nan
-    # print(N_error)
-    N_array.append(N_value)
-    N_error_array.append(N_error)
+# locations or mab values without N get NaN
+lookup_arguments = dict(lat=energy_levels["lat"], lon=energy_levels["lon"], mab=energy_levels["rounded mab"], missing="nan")
+N_array = stratification.lookup(**lookup_arguments)
+N_error_array = stratification.lookup_error(**lookup_arguments)
+assert np.all(N_array[~np.isnan(N_array)] ** 2 > 1e-9)
 
 energy_levels["N"] = N_array
 energy_levels["N Error"] = N_error_array
 
 # get coriolis frequency at the geographic location of every mooring
 print("Add f values")
-energy_levels["coriolis frequency"] = energy_levels.apply(
-    lambda row: helper.Constants.get_coriolis_frequency(row["lat"], unit="rad/s"), axis=1)
+coriolis_frequency = helper.Constants.get_coriolis_frequency(energy_levels["lat"].to_numpy(), unit="rad/s")
+energy_levels["coriolis frequency"] = coriolis_frequency
 
+# all instruments at once, eps and both errors share their intermediate results
 print("calculate dissipation rate and its error")
-energy_levels["eps_IGW"] = energy_levels.apply(
-    lambda row: eq.get_dissipation_rate(
-        coriolis_frequency=row['coriolis frequency'],
-        buoyancy_frequency=row['N'],
-        energy_level=row['available E'])
-    , axis=1)
-
-energy_levels["eps_IGW_mult_error"] = energy_levels.apply(
-    lambda row: eq.get_multiplicative_error_of_dissipation_rate(
-        coriolis_frequency=row['coriolis frequency'],
-        buoyancy_frequency=row['N'],
-        error_buoyancy_frequency=row['N Error'],
-        energy_level=row['available E'],
-        error_energy_level=row['E Error']
-    )
-    , axis=1)
-
-energy_levels["eps_IGW_add_error"] = energy_levels.apply(
-    lambda row: eq.get_additive_error_of_dissipation_rate(
-        coriolis_frequency=row['coriolis frequency'],
-        buoyancy_frequency=row['N'],
-        error_buoyancy_frequency=row['N Error'],
-        energy_level=row['available E'],
-        error_energy_level=row['E Error']
-    )
-    , axis=1)
+eps, mult_error, add_error = eq.get_dissipation_rate_and_errors(
+    coriolis_frequency=coriolis_frequency,
+    buoyancy_frequency=N_array,
+    error_buoyancy_frequency=N_error_array,
+    energy_level=energy_levels["available E"].to_numpy(),
+    error_energy_level=energy_levels["E Error"].to_numpy(),
+)
+energy_levels["eps_IGW"] = eps
+energy_levels["eps_IGW_mult_error"] = mult_error
+energy_levels["eps_IGW_add_error"] = add_error
 
 print(energy_levels["eps_IGW_mult_error"])
 
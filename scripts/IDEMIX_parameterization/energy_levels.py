@@ -0,0 +1,483 @@
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+
+import src.helper as helper
+import src.power_law as power_law
+import src.spectra
+from src.spectrum_cache import SpectrumCache
+from src.stratification import location_key
+
+TIME_BANDWIDTH_PRODUCT = 10
+# the spectral extension is fitted from this frequency on, in cpd
+EXTENSION_START_FREQ = 3.2
+# "nonlinear" uses curve_fit on the linear values, as for the published results,
+# "log-linear" fits the power law in closed form in log space, but changes the results:
+# on synthetic moorings by up to 9% in the slopes, 6% in the continuum, 3% in available_E and 18% in E_Error
+FIT_METHOD = "nonlinear"
+# only higher modes (usually n>4) of the baroclinic semidiurnal tide contain energy available for local dissipation,
+# assumed to be 30% of all baroclinic energy, Citation: Vic et al, 2019
+HIGH_MODE_FRACTION = 0.3
+# frequency band of the barotropic semidiurnal tide in the CATS model, in cpd
+CATS_BAND = (1.5, 2.5)
+# tidal constituents whose peaks are removed from the continuum, see helper.Constants.get_tidal_frequencies_in_hours
+TIDAL_CONSTITUENTS = ("M2", "S2", "N2", "K2")
+
+# one record per instrument, stored as the results table method_results/results_available_energy
+ENERGY_LEVEL_DTYPE = np.dtype([
+    ("continuum", "f8"),  # energy in the continuum without the energy at tidal frequencies
+    ("barotropic", "f8"),  # data-based estimation as the highest possibly barotropic energy => the lowest measured energy per water column
+    ("available_E", "f8"),  # the energy available for local dissipation, baroclinic energy of higher modes
+    ("E_Error", "f8"),  # associated error, calculated from the uncertainty of the spectral extension
+    ("cats", "f8"),  # barotropic tide prediction of the CATS model
+    ("tidal_energies", "f8"),  # barotropic + baroclinic semidiurnal tidal kinetic energy
+    ("lat", "f8"),
+    ("lon", "f8"),
+    ("depth", "i8"),
+    ("mab", "i8"),
+    # ingredients of the energy budget, e.g. for the Monte Carlo uncertainty propagation in monte_carlo.py
+    ("coriolis", "f8"),  # in rad/s
+    ("N", "f8"),  # in rad/s
+    ("N_error", "f8"),  # in rad/s, NaN if the stratification index has no errors
+    ("resolved_continuum", "f8"),  # resolved total energy in the continuum between f and the highest resolved frequency
+    ("psd_at_f", "f8"),  # total energy PSD at the lower edge of the f-N band, in m^2/s^2/cpd
+    ("last_freq", "f8"),  # highest resolved frequency in cpd, start of the spectral extension
+    ("slope", "f8"),  # power law c * freq^slope of the spectral extension, freq in cpd
+    ("slope_error", "f8"),
+    ("prefactor", "f8"),
+    ("prefactor_error", "f8"),
+    ("semidiurnal_baroclinic", "f8"),  # baroclinic semidiurnal total energy, before the high mode fraction
+])
+ENERGY_LEVEL_UNITS = {
+    "continuum": "m^2/s^2",
+    "barotropic": "m^2/s^2",
+    "available_E": "m^2/s^2",
+    "E_Error": "m^2/s^2",
+    "cats": "m^2/s^2",
+    "tidal_energies": "m^2/s^2",
+    "lat": "degree_north",
+    "lon": "degree_east",
+    "depth": "m",
+    "mab": "m",
+    "coriolis": "rad/s",
+    "N": "rad/s",
+    "N_error": "rad/s",
+    "resolved_continuum": "m^2/s^2",
+    "psd_at_f": "m^2/s^2/cpd",
+    "last_freq": "cpd",
+    "slope": "",
+    "slope_error": "",
+    "prefactor": "m^2/s^2/cpd^(slope+1)",
+    "prefactor_error": "m^2/s^2/cpd^(slope+1)",
+    "semidiurnal_baroclinic": "m^2/s^2",
+}
+
+
+def kinetic_to_total_energy(f, N, omega):
+    conversion = (
+            2 * (N ** 2 - f ** 2)
+            / (N ** 2 - omega ** 2)
+            * (omega ** 2)
+            / (omega ** 2 + f ** 2)
+    )
+    return conversion
+
+
+def sorted_nicely(l):
+    """ 
+    Sort the given iterable alphanumerically in the way that humans expect.
+    https://stackoverflow.com/questions/2669059/how-to-sort-alpha-numeric-set-in-python
+    """
+    import re
+    convert = lambda text: int(text) if text.isdigit() else text
+    alphanum_key = lambda key: [convert(c) for c in re.split('([0-9]+)', key)]
+    return sorted(l, key=alphanum_key)
+
+
+@dataclass(frozen=True)
+class EnergyLevelConfig:
+    """
+    Settings of the energy level calculation, the defaults are the settings of the paper.
+    The configuration is immutable and hashable, so it can key the results of a parameter sweep.
+
+      time_bandwidth_product    P of the multitaper spectra
+      extension_start_freq      in cpd, the spectral extension is fitted from this frequency on
+      fit_method                "nonlinear" or the faster "log-linear", see src.power_law.fit_power_law
+      high_mode_fraction        fraction of the baroclinic semidiurnal energy available for local dissipation
+      cats_band                 (a, b) in cpd, integration band of the barotropic tide of the CATS model
+      tidal_constituents        names of the tidal constituents, whose peaks are removed from the continuum
+    """
+    time_bandwidth_product: float = TIME_BANDWIDTH_PRODUCT
+    extension_start_freq: float = EXTENSION_START_FREQ
+    fit_method: str = FIT_METHOD
+    high_mode_fraction: float = HIGH_MODE_FRACTION
+    cats_band: tuple = CATS_BAND
+    tidal_constituents: tuple = TIDAL_CONSTITUENTS
+
+    def tidal_periods(self):
+        """
+        periods of the tidal constituents in hours, sorted in descending order
+        """
+        periods = helper.Constants.get_tidal_frequencies_in_hours(tide_type="Padman")
+        unknown_constituents = [name for name in self.tidal_constituents if name not in periods]
+        if unknown_constituents:
+            raise ValueError(f"Unknown tidal constituents {unknown_constituents}, valid are {list(periods)}")
+        return sorted((periods[name] for name in self.tidal_constituents), reverse=True)
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+def mooring_energy_levels(mooring, cats_barotropic_energy, stratification, max_depth_dict, config=None,
+                          spectrum_cache=None, name="", verbose=True):
+    """
+    Energy levels of all instruments of one mooring.
+
+    Besides the optional progress messages and the spectrum cache, the function has no side effects,
+    so that moorings can be processed in parallel, e.g. with concurrent.futures.ProcessPoolExecutor.
+
+    In:
+      mooring                Mooring dataframe of complex velocities
+      cats_barotropic_energy barotropic semidiurnal tidal kinetic energy of the CATS model at the mooring,
+                             see src.barotropic_tide.CATSBarotropicTide.band_energy
+      stratification         src.stratification.StratificationIndex of N_values.pkl and optionally N_std.pkl
+      max_depth_dict         sea floor depth per mooring longitude
+      config = None          EnergyLevelConfig, default are the settings of the paper
+      spectrum_cache = None  SpectrumCache to reuse spectra, by default an in-memory cache for this call
+      name = ""              mooring label for the progress messages
+      verbose = True         print progress messages
+
+    Out:
+      structured array of dtype ENERGY_LEVEL_DTYPE with one record per instrument
+    """
+    if spectrum_cache is None:
+        spectrum_cache = SpectrumCache()
+    if config is None:
+        config = EnergyLevelConfig()
+    time_bandwidth_product = config.time_bandwidth_product
+    tidal_periods = config.tidal_periods()
+    # nominal degrees of freedom of the multitaper estimates, 2K with K = 2P-1 tapers
+    spectral_dof = 2 * (2 * time_bandwidth_product - 1)
+    log = print if verbose else _silent
+    log(f"\nMooring {name} at {mooring.location}")
+
+    coriolis_frequency_in_rads = helper.Constants.get_coriolis_frequency(
+        mooring.location.lat, unit="rad/s", absolute=True
+    )
+    coriolis_frequency_in_cpd = helper.Constants.get_coriolis_frequency(
+        mooring.location.lat, unit="cpd", absolute=True
+    )
+
+    # Calculate the velocity spectra of all instruments of this mooring at once,
+    # instruments with time series of equal length share one taper set and one FFT call
+    mooring_velocity_spectra = spectrum_cache.mooring_total_multitaper(
+        mooring, dt=1 / 12, P=time_bandwidth_product
+    )
+
+    #--------------------------------------------------------------------------------------------------
+    # Calculate the barotropic tide per mooring
+    # 1. Calculate the minimal energy at semidiurnal tidal frequencies in the water column 
+    #    That corresponds to the measured maximum barotropic energy (assuming we are in a node of the standing wave of the baroclinic tides)
+    # 2. Compare with barotropic tide prediction of the CATS model
+
+    # iterate over all time series/columns in the mooring dataframe
+    log("Columns: ", sorted_nicely(mooring.columns))
+
+    horizontal_kinetic_energies_at_tidal_frequencies = []
+    barotropic_estimation_depths = []
+
+    for measurement_depth in sorted_nicely(mooring.columns):
+        if measurement_depth == "time":
+            continue
+
+        # Resolved horizontal kinetic energy spectrum between f and N
+        freq, velocity_spectrum = mooring_velocity_spectra[measurement_depth]
+
+        # The integral over the whole integral yield the variance of the velocity
+        # The energy of a signal of mean 0 is then half the variance
+        # Therefore we divide by 2 to have the correct physical interpretation of the spectrum
+        resolved_HKE_spectrum = velocity_spectrum / 2
+        # kinetic_psd
+        assert not np.any(np.isnan(resolved_HKE_spectrum))
+
+        # calculate integration intervals for the tidal peaks
+        # merged intervals are shared by all instruments with the same frequency grid
+        start_indices, end_indices = src.spectra.tidal_peak_intervals(
+            freq, P=time_bandwidth_product, tidal_periods=tidal_periods
+        ).T
+
+        # calculate energy per peak for all tidal peaks at once
+        #no physical meaning, as it does not differentiate between barotropic and baroclinic tides
+        horizontal_kinetic_energy_per_peak = src.spectra.PowerSpectrum(freq, resolved_HKE_spectrum).integrate(
+            a=freq[start_indices],
+            b=freq[end_indices]
+        )
+
+        horizontal_kinetic_energy_at_tidal_frequencies = np.sum(horizontal_kinetic_energy_per_peak)
+        horizontal_kinetic_energies_at_tidal_frequencies.append(horizontal_kinetic_energy_at_tidal_frequencies)
+        barotropic_estimation_depths.append(measurement_depth)
+
+    # select the depth, where the lowest amount of energy was measured
+    measured_maximum_barotropic_energy = np.min(horizontal_kinetic_energies_at_tidal_frequencies)
+    measured_maximum_barotropic_instrument_index = np.argmin(horizontal_kinetic_energies_at_tidal_frequencies)
+
+    # if CATS predicts more barotropic energy then full kinetic energy we measured
+    if cats_barotropic_energy > measured_maximum_barotropic_energy:
+        # take the measured energy as the barotropic tidal estimation
+        semidiurnal_barotropic_kinetic_energy = measured_maximum_barotropic_energy
+        log(
+            f"barotropic energy is taken as energy at {barotropic_estimation_depths[measured_maximum_barotropic_instrument_index]}m of {barotropic_estimation_depths}")
+    # else take the CATS prediction
+    else:
+        semidiurnal_barotropic_kinetic_energy = cats_barotropic_energy
+        log(f"barotropic energy is taken from CATS model")
+
+        #--------------------------------------------------------------------------------------------------
+    # Calculate the wave energy per mooring, which is available for local dissipation
+
+    # the spectral extension is fitted after the loop for all instruments at once
+    extension_fit_freqs = []
+    extension_fit_HKE_spectra = []
+    extension_fit_total_spectra = []
+    instrument_results = []
+
+    # iterate over all time series/columns in the mooring dataframe
+    #print("Columns: ",sorted_nicely(mooring.columns))
+    for measurement_depth in sorted_nicely(mooring.columns):
+        if measurement_depth == "time":
+            continue
+
+        #--------------------------------------------------------------------------------------------------
+        # Resolved horizontal kinetic energy spectrum between f and N
+        freq, velocity_spectrum = mooring_velocity_spectra[measurement_depth]
+
+        # The integral over the whole integral yields the variance of the velocity
+        # The energy of a signal of mean 0 is then half the variance
+        # Therefore we divide by 2 to have the correct physical interpretation of the spectrum
+        resolved_HKE_spectrum = velocity_spectrum / 2
+        #kinetic_psd
+        assert not np.any(np.isnan(resolved_HKE_spectrum))
+
+        # get instrument depth in units of meter above the sea floor
+        mab_of_measurement = int(max_depth_dict[mooring.location.lon]) - int(measurement_depth)
+
+        """"
+        # if measurement is too far up into the water column, log and skip it
+        if mab_of_measurement > 500:
+            print(f"Too far away from the sea floor: {mooring.location.lon}, {mab_of_measurement} mab.")
+            #continue
+        """
+
+        if mab_of_measurement < 0:
+            if mab_of_measurement > -2:
+                log(f"\tInstrument depth was corrected from {mab_of_measurement} to 0 mab.")
+                mab_of_measurement = 0
+            else:
+                raise AssertionError
+
+        # get N value at the geographic locations and depths of the velocity measurement
+        column_name = location_key(mooring.location.lat, mooring.location.lon)
+        avrg_N_in_rads = stratification.lookup(mooring.location.lat, mooring.location.lon, mab_of_measurement).item()
+        N_error_in_rads = np.nan if not stratification.has_errors else stratification.lookup_error(
+            mooring.location.lat, mooring.location.lon, mab_of_measurement
+        ).item()
+
+        #print(f"{mooring.location.lon},{mab_of_measurement},{avrg_N_in_rads=}")
+
+        avrg_N_in_cpd = avrg_N_in_rads / (2 * np.pi) * 86400
+
+        fN_freq, resolved_HKE_spectrum_between_f_and_N = helper.Constants.cut_to_f_N_interval(
+            freq,
+            resolved_HKE_spectrum,
+            f=coriolis_frequency_in_cpd,
+            N=avrg_N_in_cpd
+        )
+
+        #--------------------------------------------------------------------------------------------------
+        # convert resolved kinetic to resolved total (kinetic+potential) energy between f and N
+
+        # Correction factor in cpd
+        kinetic_to_total_energy_factor = kinetic_to_total_energy(
+            f=coriolis_frequency_in_cpd,
+            N=avrg_N_in_cpd,
+            omega=fN_freq
+        )
+
+        # correction factor cannot be larger than 1, as HKE < HKE + APE
+        if not np.all(kinetic_to_total_energy_factor > 0.999):
+            warnings.warn(f"{mooring.location}, {measurement_depth}m: kinetic to total energy factor below 1")
+
+        # Compare to Correction factor in rad/s
+        difference = kinetic_to_total_energy_factor - kinetic_to_total_energy(
+            f=coriolis_frequency_in_rads, N=avrg_N_in_rads, omega=fN_freq * (2 * np.pi) / 86400
+        )
+        assert np.all(np.abs(difference) < 1e-10)
+
+        # PSD and the frequency is in units of cpd
+        resolved_total_energy_spectrum_between_f_and_N = kinetic_to_total_energy_factor * resolved_HKE_spectrum_between_f_and_N
+
+        #--------------------------------------------------------------------------------------------------
+        # calculate resolved total energy between f and N only in the continuum (!!!) by subtracting the energy in the peaks
+
+        resolved_total_energy_between_f_and_N_spectrum = src.spectra.PowerSpectrum(
+            fN_freq, resolved_total_energy_spectrum_between_f_and_N
+        )
+        resolved_HKE_between_f_and_N_spectrum = src.spectra.PowerSpectrum(
+            fN_freq, resolved_HKE_spectrum_between_f_and_N
+        )
+
+        # integrate spectrum from f to N to get a single number
+        resolved_total_energy_between_f_and_N = resolved_total_energy_between_f_and_N_spectrum.integrate(
+            a=coriolis_frequency_in_cpd, b=avrg_N_in_cpd
+        )
+
+        # calculate integration intervals for the tidal peaks
+        # merged intervals are shared by all instruments with the same frequency grid
+        start_indices, end_indices = src.spectra.tidal_peak_intervals(
+            fN_freq, P=time_bandwidth_product, tidal_periods=tidal_periods
+        ).T
+        peak_start_freqs = fN_freq[start_indices]
+        peak_end_freqs = fN_freq[end_indices]
+
+        # calculate energy per peak for all tidal peaks at once
+        peak_integrals = resolved_total_energy_between_f_and_N_spectrum.integrate(a=peak_start_freqs, b=peak_end_freqs)
+        # compare values at the edges
+        background_heights = np.minimum(
+            resolved_total_energy_spectrum_between_f_and_N[start_indices],
+            resolved_total_energy_spectrum_between_f_and_N[end_indices]
+        )
+        background_integrals = background_heights * (peak_end_freqs - peak_start_freqs)
+        total_energy_per_peak = peak_integrals - background_integrals  #no physical meaning, as it did not differentiate between barotropic and baroclinic tides
+
+        # all spectral energy - peak energy
+        resolved_continuums_total_energy = resolved_total_energy_between_f_and_N - np.sum(total_energy_per_peak)
+
+        #--------------------------------------------------------------------------------------------------
+        # Collect the frequency band for the spectral extension up to N, which is fitted for all instruments at once
+
+        start_index = np.argmin(np.abs(fN_freq - config.extension_start_freq))
+        extension_fit_freqs.append(fN_freq[start_index:])
+        extension_fit_HKE_spectra.append(resolved_HKE_spectrum_between_f_and_N[start_index:])
+        extension_fit_total_spectra.append(resolved_total_energy_spectrum_between_f_and_N[start_index:])
+
+        #--------------------------------------------------------------------------------------------------
+        # Calculate available total energy at tidal frequencies, for which the baroclinic tide at this depth has to be determined first
+
+        # start again at the HKE, with the same tidal peak intervals as for the total energy
+        # calculate energy at tidal frequencies (peak + background) for all tidal peaks at once
+        #no physical meaning, as it does not differentiate between barotropic and baroclinic tides
+        horizontal_kinetic_energy_per_peak = resolved_HKE_between_f_and_N_spectrum.integrate(a=peak_start_freqs, b=peak_end_freqs)
+
+        # sum over energies at tidal frequencies    
+        horizontal_kinetic_energy_at_tidal_frequencies = np.sum(horizontal_kinetic_energy_per_peak)
+
+        # subtract barotropic tide to get baroclinic tide
+        # the barotropic tide for each mooring was calculated above
+        semidiurnal_baroclinic_kinetic_energy = horizontal_kinetic_energy_at_tidal_frequencies - semidiurnal_barotropic_kinetic_energy
+
+        # baroclinic energy cannot be negative and is 0 in the worst case
+        assert semidiurnal_baroclinic_kinetic_energy >= 0
+
+        # As this energy is contained in internal waves, it also must be converted to include the potential energy
+        # use conversion factor value at 2 cpd
+        semidiurnal_index = np.argmin(np.abs(fN_freq - 2))
+        # assert the index is neither the start or end of the frequency array
+        assert semidiurnal_index != 0 and semidiurnal_index != len(fN_freq) - 1
+        baroclinic_conversion_factor = kinetic_to_total_energy_factor[semidiurnal_index]
+
+        semidiurnal_baroclinic_total_energy = baroclinic_conversion_factor * semidiurnal_baroclinic_kinetic_energy
+
+        # only higher modes (usually n>4) contain energy available for local dissipation
+        # by default assumed to be 30% of all baroclinic energy
+        # Citation: Vic et al, 2019
+        available_semidiurnal_baroclinic_energy = config.high_mode_fraction * semidiurnal_baroclinic_total_energy
+
+        # save results, the continuum energy is completed after the spectral extension
+        instrument_results.append(dict(
+            column_name=column_name,
+            measurement_depth=measurement_depth,
+            mab_of_measurement=mab_of_measurement,
+            avrg_N_in_rads=avrg_N_in_rads,
+            N_error_in_rads=N_error_in_rads,
+            avrg_N_in_cpd=avrg_N_in_cpd,
+            last_freq=fN_freq[-1],  # highest resolved frequency
+            resolved_continuums_total_energy=resolved_continuums_total_energy,
+            psd_at_f=resolved_total_energy_spectrum_between_f_and_N[0],
+            semidiurnal_baroclinic_total_energy=semidiurnal_baroclinic_total_energy,
+            available_semidiurnal_baroclinic_energy=available_semidiurnal_baroclinic_energy,
+        ))
+
+    #--------------------------------------------------------------------------------------------------
+    # Calculate total wave continuum energy by extending the resolved continuum up to N
+
+    # fit constant slope to the unaltered HKE spectrum, for all instruments of the mooring at once
+    fit_freq, fit_HKE_spectra = power_law.stack_bands(extension_fit_freqs, extension_fit_HKE_spectra)
+    fitted_slopes, fitted_slope_errors, _prefactors, _prefactor_errors = power_law.fit_power_law(
+        fit_freq, fit_HKE_spectra, dof=spectral_dof, method=config.fit_method
+    )  # one standard deviation errors
+
+    # fit prefactor to resolved total energy spectrum, given the determined slope
+    # x (frequency range) stays the same
+    _fit_freq, fit_total_spectra = power_law.stack_bands(extension_fit_freqs, extension_fit_total_spectra)
+    fitted_slope_heights, fitted_slope_height_errors = power_law.fit_power_law_prefactor(
+        fit_freq, fit_total_spectra, slope=fitted_slopes, dof=spectral_dof, method=config.fit_method
+    )
+
+    # integrate the power law in closed form from the highest resolved frequency up to N
+    # for the fit and the error bounds of all instruments at once
+    last_freqs = np.array([instrument["last_freq"] for instrument in instrument_results])
+    avrg_N_values_in_cpd = np.array([instrument["avrg_N_in_cpd"] for instrument in instrument_results])
+    # the error bounds use the slope +- its error, but go through the same point at the highest resolved frequency
+    bound_slopes = fitted_slopes + np.array([[0], [1], [-1]]) * fitted_slope_errors
+    fixed_point_heights = fitted_slope_heights * last_freqs ** fitted_slopes
+    bound_prefactors = fixed_point_heights * last_freqs ** -bound_slopes
+    extension_total_energies, upper_bound_extension_total_energies, lower_bound_extension_total_energies = (
+        power_law.integrate_power_law(bound_prefactors, bound_slopes, a=last_freqs, b=avrg_N_values_in_cpd)
+    )
+    assert np.all(upper_bound_extension_total_energies > lower_bound_extension_total_energies)
+    error_extension_energies = 0.5 * np.abs(upper_bound_extension_total_energies - lower_bound_extension_total_energies)
+
+    records = np.empty(len(instrument_results), dtype=ENERGY_LEVEL_DTYPE)
+    records["slope"] = fitted_slopes
+    records["slope_error"] = fitted_slope_errors
+    records["prefactor"] = fitted_slope_heights
+    records["prefactor_error"] = fitted_slope_height_errors
+    for record, instrument, tidal_energy, fitted_slope, extension_total_energy, error_extension_energy in zip(
+            records, instrument_results, horizontal_kinetic_energies_at_tidal_frequencies,
+            fitted_slopes, extension_total_energies, error_extension_energies):
+        column_name = instrument["column_name"]
+        measurement_depth = instrument["measurement_depth"]
+        continuum_total_energy = instrument["resolved_continuums_total_energy"] + extension_total_energy
+        log(
+            f"{column_name}, {measurement_depth}m: spectral slope = {fitted_slope:.2f}, total extension energy is responsible for {(extension_total_energy / continuum_total_energy):.1%} of the total continuum energy")
+
+        #--------------------------------------------------------------------------------------------------
+        # Combine all energies
+
+        available_semidiurnal_baroclinic_energy = instrument["available_semidiurnal_baroclinic_energy"]
+        available_energy = continuum_total_energy + available_semidiurnal_baroclinic_energy
+        log(
+            f"{column_name}, {measurement_depth}m: available semidiurnal baroclinic energy is responsible for {(available_semidiurnal_baroclinic_energy / available_energy):.1%} of the total available energy")
+
+        # save results
+        record["continuum"] = continuum_total_energy
+        record["barotropic"] = semidiurnal_barotropic_kinetic_energy
+        record["available_E"] = available_energy
+        record["E_Error"] = error_extension_energy
+        record["cats"] = cats_barotropic_energy
+        record["tidal_energies"] = tidal_energy
+        record["lat"] = mooring.location.lat
+        record["lon"] = mooring.location.lon
+        record["depth"] = int(measurement_depth)
+        record["mab"] = instrument["mab_of_measurement"]
+        record["coriolis"] = coriolis_frequency_in_rads
+        record["N"] = instrument["avrg_N_in_rads"]
+        record["N_error"] = instrument["N_error_in_rads"]
+        record["resolved_continuum"] = instrument["resolved_continuums_total_energy"]
+        record["psd_at_f"] = instrument["psd_at_f"]
+        record["last_freq"] = instrument["last_freq"]
+        record["semidiurnal_baroclinic"] = instrument["semidiurnal_baroclinic_total_energy"]
+
+    return records
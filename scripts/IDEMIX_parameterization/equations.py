@@ -1,13 +1,16 @@
+import pathlib
+
 import numpy as np
 
+MIXING_EFFICIENCY = 0.2
+MU_0 = 1 / 3  # value recommended by Pollmann et al., 2017
+M_STAR = 0.01
+
 
 def get_dissipation_rate(coriolis_frequency, buoyancy_frequency, energy_level):
     """
     eq. 18 from Olbers & Eden, 2013
     """
-    MIXING_EFFICIENCY = 0.2
-    MU_0 = 1 / 3  # value recommended by Pollmann et al., 2017
-    m_star = 0.01
     effective_coriolis_frequency = (
             np.abs(coriolis_frequency) *
             np.arccosh(buoyancy_frequency / np.abs(coriolis_frequency))
@@ -17,7 +20,7 @@ def get_dissipation_rate(coriolis_frequency, buoyancy_frequency, energy_level):
             1 / (1 + MIXING_EFFICIENCY)
             * MU_0
             * effective_coriolis_frequency
-            * m_star ** 2
+            * M_STAR ** 2
             * energy_level ** 2
             / buoyancy_frequency ** 2
     )
@@ -67,23 +70,19 @@ def get_additive_error_of_dissipation_rate(coriolis_frequency, buoyancy_frequenc
     """
     eq. 18 from Olbers & Eden, 2013
     """
-    MIXING_EFFICIENCY = 0.2
-    MU_0 = 1 / 3  # value recommeded by Pollmann et al 2017
-    m_star = 0.01
-
     arccosh_N_derivative = (
             1 / (
             np.sqrt(buoyancy_frequency / np.abs(coriolis_frequency) - 1)
             * np.sqrt(buoyancy_frequency / np.abs(coriolis_frequency) + 1)
     )
-            * m_star ** 2
+            * M_STAR ** 2
             * energy_level ** 2
             / buoyancy_frequency ** 2
     )
 
     exponent_N_derivative = (
             np.arccosh(buoyancy_frequency / np.abs(coriolis_frequency))
-            * -2 * m_star ** 2
+            * -2 * M_STAR ** 2
             * energy_level ** 2
             / buoyancy_frequency ** 3
     )
@@ -104,7 +103,7 @@ def get_additive_error_of_dissipation_rate(coriolis_frequency, buoyancy_frequenc
             1 / (1 + MIXING_EFFICIENCY)
             * MU_0
             * effective_coriolis_frequency
-            * 2 * m_star ** 2
+            * 2 * M_STAR ** 2
             * energy_level
             / (buoyancy_frequency ** 2)
             * error_energy_level
@@ -113,3 +112,189 @@ def get_additive_error_of_dissipation_rate(coriolis_frequency, buoyancy_frequenc
     dissipation_total_error = np.sqrt(error_due_to_N ** 2 + error_due_to_E ** 2)
 
     return dissipation_total_error
+
+
+def _dissipation_rate_and_errors_kernel(f, N, error_N, E, error_E, eps, multiplicative_error, additive_error):
+    """
+    eps and both errors for arrays of equal shape, the results are written into the last three arguments.
+    The same equations as above, but arccosh(N/|f|), sqrt(N^2-f^2) and the powers of E and N are computed once
+    and the intermediate results reuse two scratch arrays.
+    """
+    abs_f = np.abs(f)
+    ratio = N / abs_f
+    arccosh_ratio = np.arccosh(ratio)
+    # sqrt(N/|f| - 1) * sqrt(N/|f| + 1) = sqrt(N^2 - f^2) / |f|
+    sqrt_ratio_term = np.sqrt(ratio + 1)
+    ratio -= 1
+    sqrt_ratio_term *= np.sqrt(ratio, out=ratio)
+    # m*^2 E^2 / N^2
+    energy_term = np.square(E)
+    energy_term *= M_STAR ** 2
+    energy_term /= np.square(N)
+    prefactor = 1 / (1 + MIXING_EFFICIENCY) * MU_0
+
+    # dissipation rate, eq. 18 from Olbers & Eden, 2013
+    np.multiply(abs_f, arccosh_ratio, out=eps)
+    eps *= energy_term
+    eps *= prefactor
+
+    # additive error, see get_additive_error_of_dissipation_rate
+    # N derivative of the arccosh term, as arccosh_N_derivative there
+    np.divide(energy_term, sqrt_ratio_term, out=additive_error)
+    # N derivative of the N^-2 term, energy_term is no longer needed afterwards
+    energy_term *= arccosh_ratio
+    energy_term *= -2 / N
+    additive_error += energy_term
+    additive_error *= abs_f
+    additive_error *= prefactor
+    additive_error *= error_N
+    # error due to E, 2 eps / E * error of E
+    error_due_to_E = np.multiply(eps, 2 * error_E / E, out=energy_term)
+    np.hypot(additive_error, error_due_to_E, out=additive_error)
+
+    # multiplicative error, see get_multiplicative_error_of_dissipation_rate
+    # sqrt(N^2 - f^2) = |f| * sqrt_ratio_term
+    sqrt_ratio_term *= abs_f
+    sqrt_ratio_term *= arccosh_ratio
+    np.reciprocal(sqrt_ratio_term, out=multiplicative_error)
+    multiplicative_error -= 2 / N
+    multiplicative_error *= error_N / np.log(10)
+    error_due_to_E = np.multiply(error_E, 2 / np.log(10), out=energy_term)
+    error_due_to_E /= E
+    np.hypot(multiplicative_error, error_due_to_E, out=multiplicative_error)
+    np.power(10, multiplicative_error, out=multiplicative_error)
+
+
+def get_dissipation_rate_and_errors(coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency, energy_level,
+                                    error_energy_level, out=None, chunk_size=None):
+    """
+    Dissipation rate and its multiplicative and additive error in one pass,
+    equal to get_dissipation_rate, get_multiplicative_error_of_dissipation_rate
+    and get_additive_error_of_dissipation_rate up to rounding.
+
+    In:
+      coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency, energy_level, error_energy_level
+                             scalars or arrays, which are broadcast against each other
+      out = None             optional tuple of three float arrays of the broadcast shape for the results
+      chunk_size = None      evaluate chunk_size entries along the first axis at a time,
+                             which bounds the memory of the intermediate arrays for large fields
+
+    Out:
+      eps, multiplicative_error, additive_error
+    """
+    inputs = np.broadcast_arrays(*(
+        np.asarray(value, dtype=float) for value in
+        (coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency, energy_level, error_energy_level)
+    ))
+    shape = inputs[0].shape
+    if out is None:
+        out = tuple(np.empty(shape) for _ in range(3))
+    if any(np.shape(array) != shape for array in out):
+        raise ValueError(f"The out arrays must have the broadcast shape {shape} of the inputs")
+
+    if len(shape) == 0:
+        # the kernel writes into arrays, so scalars are evaluated as arrays of length 1
+        _dissipation_rate_and_errors_kernel(*(array.reshape(1) for array in (*inputs, *out)))
+    elif chunk_size is None:
+        _dissipation_rate_and_errors_kernel(*inputs, *out)
+    else:
+        for start in range(0, shape[0], chunk_size):
+            chunk = slice(start, start + chunk_size)
+            _dissipation_rate_and_errors_kernel(
+                *(array[chunk] for array in inputs), *(array[chunk] for array in out)
+            )
+    return out
+
+
+# memory budget of the scratch arrays of one block of get_dissipation_rate_and_errors_on_grid
+MAX_BLOCK_BYTES = 64 * 2 ** 20
+RESULT_NAMES = ("eps_IGW", "eps_IGW_mult_error", "eps_IGW_add_error")
+
+
+def create_result_memmaps(directory, shape):
+    """
+    Three .npy files eps_IGW.npy, eps_IGW_mult_error.npy and eps_IGW_add_error.npy of the given shape,
+    opened as writable memory maps, e.g. as out of get_dissipation_rate_and_errors_on_grid.
+    They can be read back with np.load(..., mmap_mode="r").
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    return tuple(
+        np.lib.format.open_memmap(directory / f"{name}.npy", mode="w+", dtype=float, shape=tuple(shape))
+        for name in RESULT_NAMES
+    )
+
+
+def _block(field, full_shape, rows):
+    """
+    rows of a field along the first axis of full_shape, loaded into memory, fields which are
+    broadcast along that axis (fewer dimensions or length 1) are returned whole
+    """
+    shape = np.shape(field)
+    if len(shape) == len(full_shape) and shape[0] == full_shape[0]:
+        field = field[rows]
+    # also computes dask arrays and reads memory-mapped or lazily loaded files
+    return np.asarray(field, dtype=float)
+
+
+def get_dissipation_rate_and_errors_on_grid(coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency,
+                                            energy_level, error_energy_level, out=None, block_size=None):
+    """
+    get_dissipation_rate_and_errors for large gridded fields, e.g. (lat x lon x depth),
+    streamed in blocks along the first axis with bounded memory.
+
+    The fields can be NumPy arrays, memory maps, dask arrays, xarray DataArrays (also dask-backed)
+    or any array-like with a shape that supports slicing and np.asarray. Only one block of each field is
+    held in memory at a time. The fields are broadcast positionally like NumPy arrays,
+    e.g. the Coriolis frequency of a (lat x lon x depth) grid can be given with shape (n_lat, 1, 1).
+
+    In:
+      coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency, energy_level, error_energy_level
+                             fields in rad/s and m^2/s^2
+      out = None             optional tuple of three writable arrays of the broadcast shape, e.g. from
+                             create_result_memmaps, a netCDF/HDF5 variable or a zarr array. Each block is
+                             written as soon as it is computed. By default new NumPy arrays are returned
+      block_size = None      rows along the first axis per block, by default chosen so that the
+                             scratch arrays of one block stay below MAX_BLOCK_BYTES
+
+    Out:
+      eps, multiplicative_error, additive_error, as out. Without out and if energy_level is an
+      xarray DataArray of the full shape, they are DataArrays with its dimensions and coordinates
+    """
+    fields = (coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency, energy_level, error_energy_level)
+    # the underlying (NumPy or dask) arrays of xarray objects, which are broadcast by position
+    arrays = [field.data if hasattr(field, "dims") else field for field in fields]
+    shape = np.broadcast_shapes(*(np.shape(array) for array in arrays))
+    if len(shape) == 0:
+        return get_dissipation_rate_and_errors(*(np.asarray(array, dtype=float) for array in arrays), out=out)
+
+    wrap_as_data_array = out is None and hasattr(energy_level, "dims") and np.shape(energy_level) == shape
+    if out is None:
+        out = tuple(np.empty(shape) for _ in range(3))
+    if any(np.shape(array) != shape for array in out):
+        raise ValueError(f"The out arrays must have the broadcast shape {shape} of the inputs")
+
+    if block_size is None:
+        row_size = int(np.prod(shape[1:]))
+        # the five inputs, three results and about five intermediate arrays of the kernel
+        block_size = max(1, MAX_BLOCK_BYTES // (13 * 8 * max(row_size, 1)))
+    # scratch arrays for the results, reused by all blocks
+    scratch = tuple(np.empty((min(block_size, shape[0]),) + shape[1:]) for _ in range(3))
+
+    for start in range(0, shape[0], block_size):
+        rows = slice(start, min(start + block_size, shape[0]))
+        n_rows = rows.stop - rows.start
+        block_out = tuple(array[:n_rows] for array in scratch)
+        get_dissipation_rate_and_errors(
+            *(np.broadcast_to(_block(array, shape, rows), (n_rows,) + shape[1:]) for array in arrays),
+            out=block_out
+        )
+        for array, block in zip(out, block_out):
+            array[rows] = block
+
+    for array in out:
+        if hasattr(array, "flush"):
+            array.flush()
+    if wrap_as_data_array:
+        return tuple(energy_level.copy(data=array) for array in out)
+    return out
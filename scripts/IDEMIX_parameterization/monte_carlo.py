@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+import src.power_law as power_law
+import src.results_store as results_store
+import equations as eq
+
+# reported percentiles, the median and the 1 and 2 sigma ranges of a normal distribution
+PERCENTILES = (2.5, 16, 50, 84, 97.5)
+# range of the fraction of the baroclinic semidiurnal energy in high modes, around the 0.3 of Vic et al, 2019
+HIGH_MODE_FRACTION_RANGE = (0.2, 0.4)
+# relative standard deviation of the lower edge of the f-N integration band
+RELATIVE_F_BAND_EDGE_ERROR = 0.05
+
+
+def sample_energy_budget(records, n_samples=10_000, high_mode_fraction_range=HIGH_MODE_FRACTION_RANGE,
+                         relative_f_band_edge_error=RELATIVE_F_BAND_EDGE_ERROR, seed=None):
+    """
+    Monte Carlo samples of the available energy and the IDEMIX dissipation rate for all instruments at once.
+
+    The energy budget of energy_levels.mooring_energy_levels is evaluated as arrays of shape
+    (n_instruments, n_samples) with the following random inputs:
+      slope                  normal, with the standard error of the fit
+      prefactor              log-normal, with the relative error of the fit. Together with the slope
+                             it defines the spectral extension pivoted at the highest resolved frequency,
+                             like the error bounds of the nominal calculation
+      N                      normal with the standard deviation from N_std.pkl, truncated above f
+      lower band edge        normal around f with relative_f_band_edge_error,
+                             changing the resolved continuum by psd_at_f times the shift
+      high mode fraction     uniform in high_mode_fraction_range
+
+    The kinetic to total energy conversion of the resolved continuum is kept at the nominal N,
+    it differs from 1 by less than 1e-3 in the resolved frequency range.
+
+    In:
+      records                structured array of energy_levels.ENERGY_LEVEL_DTYPE,
+                             or any mapping with the same field names
+      n_samples = 10000      number of samples per instrument
+      high_mode_fraction_range, relative_f_band_edge_error    see above
+      seed = None            seed of the random number generator
+
+    Out:
+      dictionary of arrays of shape (n_instruments, n_samples) for "available_E" and "eps_IGW"
+    """
+    rng = np.random.default_rng(seed)
+
+    def field(name):
+        return np.asarray(records[name], dtype=float)[:, None]
+
+    coriolis, N, N_error = field("coriolis"), field("N"), field("N_error")
+    n_instruments = len(coriolis)
+    size = (n_instruments, n_samples)
+    # unit conversion of frequencies from rad/s to cpd
+    rads_to_cpd = 86400 / (2 * np.pi)
+
+    N_samples = N + np.nan_to_num(N_error) * rng.standard_normal(size)
+    N_samples = np.maximum(N_samples, np.abs(coriolis) * (1 + 1e-6))
+
+    band_edge_shift = relative_f_band_edge_error * np.abs(coriolis) * rads_to_cpd * rng.standard_normal(size)
+    resolved_continuum = field("resolved_continuum") - field("psd_at_f") * band_edge_shift
+
+    last_freq = field("last_freq")
+    slope = field("slope")
+    slope_samples = slope + field("slope_error") * rng.standard_normal(size)
+    fixed_point_height = field("prefactor") * last_freq ** slope
+    relative_prefactor_error = field("prefactor_error") / field("prefactor")
+    fixed_point_height = fixed_point_height * np.exp(relative_prefactor_error * rng.standard_normal(size))
+    extension = power_law.integrate_power_law(
+        fixed_point_height * last_freq ** -slope_samples,
+        slope_samples,
+        a=last_freq,
+        b=np.maximum(N_samples * rads_to_cpd, last_freq)
+    )
+
+    high_mode_fraction = rng.uniform(*high_mode_fraction_range, size=size)
+    available_energy = resolved_continuum + extension + high_mode_fraction * field("semidiurnal_baroclinic")
+
+    dissipation_rate = eq.get_dissipation_rate(
+        coriolis_frequency=coriolis,
+        buoyancy_frequency=N_samples,
+        energy_level=available_energy
+    )
+    return {"available_E": available_energy, "eps_IGW": dissipation_rate}
+
+
+def monte_carlo_percentiles(records, percentiles=PERCENTILES, **kwargs):
+    """
+    Percentiles of the Monte Carlo samples of sample_energy_budget per instrument.
+
+    Out:
+      dictionary of arrays of shape (len(percentiles), n_instruments) for "available_E" and "eps_IGW"
+    """
+    samples = sample_energy_budget(records, **kwargs)
+    return {name: np.percentile(values, percentiles, axis=-1) for name, values in samples.items()}
+
+
+if __name__ == "__main__":
+    data = results_store.read_results("method_results/results_available_energy")
+    results = monte_carlo_percentiles(data, seed=0)
+
+    percentile_df = pd.DataFrame(data={
+        "lon": data["lon"],
+        "lat": data["lat"],
+        "rounded depth": data["depth"],
+        "rounded mab": data["mab"],
+    })
+    for name, values in results.items():
+        for percentile, percentile_values in zip(PERCENTILES, values):
+            percentile_df[f"{name} p{percentile:g}"] = percentile_values
+    percentile_df.to_csv("./method_results/monte_carlo_percentiles.csv", index=False)
+    print(percentile_df)
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+import src.helper as helper
+import src.results_store as results_store
+import equations as eq
+
+
+def interpolate_energy_field(lon, mab, energy, grid_lons, grid_mab):
+    """
+    Energy field on a (mab x longitude) grid from the values at the instruments of several moorings.
+
+    Each mooring profile is linearly interpolated in mab and kept constant below its deepest instrument,
+    above its shallowest instrument it is NaN. The profiles are then linearly interpolated in longitude,
+    outside of the longitude range of the moorings the field is NaN.
+
+    In:
+      lon, mab, energy       arrays with one value per instrument, instruments of one mooring share their lon
+      grid_lons              longitudes of the grid columns
+      grid_mab               meters above bottom of the grid rows
+
+    Out:
+      array of shape (len(grid_mab), len(grid_lons))
+    """
+    lon, mab, energy = (np.asarray(value, dtype=float) for value in (lon, mab, energy))
+    grid_lons = np.asarray(grid_lons, dtype=float)
+    grid_mab = np.asarray(grid_mab, dtype=float)
+
+    mooring_lons = np.unique(lon)
+    profiles = np.empty((len(mooring_lons), len(grid_mab)))
+    for profile, mooring_lon in zip(profiles, mooring_lons):
+        is_mooring = lon == mooring_lon
+        order = np.argsort(mab[is_mooring])
+        profile[:] = np.interp(grid_mab, mab[is_mooring][order], energy[is_mooring][order], right=np.nan)
+
+    if len(mooring_lons) == 1:
+        return np.where(grid_lons == mooring_lons[0], profiles[0][:, None], np.nan)
+
+    # linear interpolation in longitude between the neighbouring moorings of each grid column
+    upper = np.clip(np.searchsorted(mooring_lons, grid_lons), 1, len(mooring_lons) - 1)
+    lower = upper - 1
+    weights = (grid_lons - mooring_lons[lower]) / (mooring_lons[upper] - mooring_lons[lower])
+    field = (1 - weights) * profiles[lower].T + weights * profiles[upper].T
+    is_outside = (grid_lons < mooring_lons[0]) | (grid_lons > mooring_lons[-1])
+    field[:, is_outside] = np.nan
+    # grid columns at a mooring take its profile, also where the profile of the neighbouring mooring is NaN
+    is_at_mooring = np.isin(grid_lons, mooring_lons)
+    field[:, is_at_mooring] = profiles[np.searchsorted(mooring_lons, grid_lons[is_at_mooring])].T
+    return field
+
+
+def transect_dissipation(energy, energy_error, N, N_error, lat):
+    """
+    IDEMIX dissipation rate and its errors on a (mab x longitude bin) grid in one vectorized pass,
+    see equations.get_dissipation_rate_and_errors
+
+    In:
+      energy, energy_error   available energy and its error in m^2/s^2, dataframes or arrays of the grid shape
+      N, N_error             buoyancy frequency and its error in rad/s, dataframes or arrays of the grid shape
+      lat                    latitude of each longitude bin
+
+    Grid points without N or energy, or with N <= |f|, where no internal wave band exists, are NaN.
+
+    Out:
+      eps, multiplicative_error, additive_error    dataframes with the index and columns of N if N is a
+                                                   dataframe, arrays of the grid shape otherwise
+    """
+    coriolis_frequency = helper.Constants.get_coriolis_frequency(np.asarray(lat, dtype=float), unit="rad/s")
+    buoyancy_frequency = np.asarray(N, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        results = eq.get_dissipation_rate_and_errors(
+            coriolis_frequency=coriolis_frequency[None, :],
+            buoyancy_frequency=buoyancy_frequency,
+            error_buoyancy_frequency=np.asarray(N_error, dtype=float),
+            energy_level=np.asarray(energy, dtype=float),
+            error_energy_level=np.asarray(energy_error, dtype=float),
+        )
+        # at N = |f| the dissipation rate would be 0 with infinite errors
+        no_wave_band = ~(buoyancy_frequency > np.abs(coriolis_frequency)[None, :])
+    for result in results:
+        result[no_wave_band] = np.nan
+    if isinstance(N, pd.DataFrame):
+        return tuple(pd.DataFrame(result, index=N.index, columns=N.columns) for result in results)
+    return results
+
+
+def main():
+    # binned stratification of the transect, see combine_and_bin_neutral_density.py
+    binned_N = pd.read_csv("../preprocessing/method_results/binned_N.csv", index_col=0)
+    binned_N_std = pd.read_csv("../preprocessing/method_results/binned_N_std.csv", index_col=0)
+    bin_coordinates = pd.read_csv("../../derived_data/bin_coordinates.csv")
+    bin_lons = binned_N.columns.astype("float").to_numpy()
+    assert np.allclose(bin_lons, bin_coordinates["bin_lons"])
+
+    print("Interpolate the available energy between the moorings")
+    data = results_store.read_results(
+        "method_results/results_available_energy", columns=["lon", "mab", "available_E", "E_Error"]
+    )
+    energy = interpolate_energy_field(data["lon"], data["mab"], data["available_E"], bin_lons, binned_N.index)
+    energy_error = interpolate_energy_field(data["lon"], data["mab"], data["E_Error"], bin_lons, binned_N.index)
+
+    print("calculate dissipation rate and its error")
+    eps, mult_error, add_error = transect_dissipation(
+        energy, energy_error, binned_N, binned_N_std, lat=bin_coordinates["bin_lats"]
+    )
+
+    # same layout as binned_thorpe_dissipation.csv, rows are mab, columns are the longitude bin centers
+    eps.to_csv("./method_results/binned_IDEMIX_dissipation.csv")
+    mult_error.to_csv("./method_results/binned_IDEMIX_dissipation_mult_error.csv")
+    add_error.to_csv("./method_results/binned_IDEMIX_dissipation_add_error.csv")
+    eps.to_csv("../../derived_data/binned_IDEMIX_dissipation.csv")
+    print("done")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import numpy as np
 import pandas as pd
 from scipy.interpolate import interp1d  # is considered legacy code, will be in the future removed from scipy
 
+from src.longitude_bins import bin_by_longitude, binned_std
 from src.read_CTDs import load_Joinville_transect_CTDs
 
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
@@ -67,31 +68,11 @@ gamma_n_df.to_pickle("../../data/Neutral_density_df_with_mab.pkl")
 
 lons = gamma_n_df.columns.to_numpy()
 mab = gamma_n_df.index
-#removal of outlier
+#removal of outlier, also for N, which is calculated from the same profile
 gamma_n_df.iloc[:,82] = np.nan
+N_df.iloc[:,82] = np.nan
 
-BIN_EDGES = np.arange(-53.75, -46.25, 0.5)
-BIN_CENTER = BIN_EDGES[:-1]+0.25
-#lons = data.columns.to_numpy()
-binned_gamma_n_df = pd.DataFrame(index=gamma_n_df.index) #, columns = BIN_CENTER)
-for i, edge in enumerate(BIN_EDGES):
-    if i == len(BIN_EDGES)-1: break
-    assert BIN_EDGES[i] == edge
-    start = np.argmin(np.abs(lons - edge))
-    next_edge = BIN_EDGES[i+1]
-    stop = np.argmin(np.abs(lons - next_edge))
-    center = BIN_CENTER[i]
-    print(start, stop, f"{lons[start]:.2f}, {center}, {lons[stop]:.2f}")
-
-
-    if i != len(BIN_EDGES)-2:
-        assert lons[start] <= center
-        assert lons[stop] >= center
-        binned_gamma_n_df[f"{center}"] = gamma_n_df.iloc[:, start:stop].mean(axis="columns")
-
-    else: #including the rightmost edge
-        assert lons[start] <= center
-        binned_gamma_n_df[f"{center}"] = gamma_n_df.iloc[:, start:].mean(axis="columns")
+binned_gamma_n_df = bin_by_longitude(gamma_n_df, verbose=True)
 # rows = []
 # for index, row in gamma_n_df.iterrows():
 #     values = row.to_numpy()
@@ -106,4 +87,14 @@ for i, edge in enumerate(BIN_EDGES):
 binned_gamma_n_df.to_csv("./method_results/binned_gamma_n.csv")
 binned_gamma_n_df.to_csv("../../derived_data/binned_neutral_density.csv")
 
+# binned buoyancy frequency in rad/s and its standard deviation between the profiles of a bin,
+# e.g. as the error of N for the transect-wide IDEMIX dissipation rate.
+# Bins with a single profile at a given mab, where this spread is undefined, get the pooled spread of all bins
+# at that mab, so that the dissipation rate errors are not NaN there, see src.longitude_bins.binned_std
+binned_N_df = bin_by_longitude(N_df)
+binned_N_std_df = binned_std(N_df)
+assert not np.any(binned_N_std_df.isna() & binned_N_df.notna()), "N without an error"
+binned_N_df.to_csv("./method_results/binned_N.csv")
+binned_N_std_df.to_csv("./method_results/binned_N_std.csv")
+
 print("done")
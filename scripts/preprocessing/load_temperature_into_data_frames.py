@@ -1,4 +1,4 @@
-import helper_functions as help
+import src.helper as help
 import numpy as np
 import pandas as pd
 import scipy.io as sio
@@ -22,11 +22,11 @@ v_list = np.squeeze(data["VC"])
 SA_list = np.squeeze(data["SA"])
 Temp_list = np.squeeze(data["TEMP"])
 
-#Convert matlab time arrays to arrays filled with python datetime objects
+#Convert matlab time arrays to arrays of datetime64
 time_list = []
 for i in range(lat_list.size):
     mtime = np.squeeze(data["DATETIME"])[i]
-    time_list.append([help.Conversions.matlab2datetime(tval) for tval in mtime.flatten().tolist()])
+    time_list.append(help.matlab2datetime64(mtime.flatten()))
 time_list = np.asarray(time_list)
 
 # Create dictionary with the depth of the deepest mooring per longitude value
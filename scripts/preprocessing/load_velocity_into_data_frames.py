@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 import scipy.io as sio
-import src.helper_functions as helper
+import src.helper as helper
 
 from src.location import Location
 from src.mooring import Mooring
@@ -23,11 +23,11 @@ v_list = np.squeeze(data["VC"])
 SA_list = np.squeeze(data["SA"])
 Temp_list = np.squeeze(data["TEMP"])
 
-#Convert matlab time arrays to arrays filled with python datetime objects
+#Convert matlab time arrays to arrays of datetime64
 time_list = []
 for i in range(lat_list.size):
     mtime = np.squeeze(data["DATETIME"])[i]
-    time_list.append([helper.Conversions.matlab2datetime(tval) for tval in mtime.flatten().tolist()])
+    time_list.append(helper.matlab2datetime64(mtime.flatten()))
 #time_list = np.asarray(time_list)
 
 # Create dictionary with the depth of the deepest mooring per longitude value
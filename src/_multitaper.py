@@ -1,32 +1,24 @@
 import multitaper as mt #Prieto 2022 https://github.com/gaprieto/multitaper
+import numpy as np
 import scipy.signal as sg  #signal analysis
 
-fs = 1/dt
+import src.spectra as spectra
+
 
 def multitaper(complex_velocity,product_bandwidth, sampling_frequency):
     """
+    Adaptive multitaper spectrum, now computed natively by src.spectra.adaptive_multitaper
 
-
+    Returns:
+        freq, S, dof:   frequencies, two-sided spectrum and degrees of freedom per frequency
     """
-    fo, So = sg.periodogram(cv-np.mean(cv), fs=1/dt) #fs = sampling frequency (cyclic)
-
-    #using somewhat different settings than the default for MTSpec
-    #setting nfft, number of points in the FFT, to number of data points, so no zero-padding
-    #setting adapt to 1 for standard average multitaper spectrum for illustrative purposes — 
-    #    though in general I do prefer the adaptive version as standard
-    P = 16
-    spec = mt.MTSpec(cv-np.mean(cv), nw=P, dt=dt, iadapt=1, nfft=len(cv))
-    #vars(spec)  #use this to inspect the spec object output by MTSpec
-    S = np.ravel(spec.spec)
-    f = np.ravel(spec.freq)
-
+    freq, S, dof = spectra.adaptive_multitaper(
+        complex_velocity, dt=1/sampling_frequency, P=product_bandwidth, total=False
+    )
 
     #verify variance is approximately recovered
-    #use numpy is_approximately equal
-    #TODO assert f[1]-f[0])*np.sum(S) is close to np.var(cv)
-
-    #print((f[1]-f[0])*np.sum(S)) #verify variance is approximately recovered
-    raise NotImplementedError
+    assert np.isclose((freq[1]-freq[0])*np.sum(S), np.var(complex_velocity))
+    return freq, S, dof
     
 def get_total_psd(S,f):
     """
@@ -78,38 +70,8 @@ def mconf(K,gamma,str):
     taken from http://jmlilly.net/course/labs/html/SpectralAnalysis-Python.html
     """
 
-    dx=0.0001
-    #Compute pdf symmetrically about unity
-
-    if str=='lin':
-    
-        x1=np.arange(1-dx/2,-1,step=-dx)*2*K  #from one to minus one
-        x2=np.arange(1+dx/2,3,step=dx)*2*K #from 1 to three 
-        fx=(chi2.pdf(x1,2*K)+chi2.pdf(x2,2*K))*2*K
-        sumfx=np.cumsum(fx)*dx
-
-        ii=np.where(sumfx>=gamma)[0][0]
-        ra=x1[ii]/2/K
-        rb=x2[ii]/2/K
-    
-    elif str=='log':
-        
-        xo=np.log(2)+np.log(1/2/K)+digamma(K) #see pav15-arxiv
-        c=np.log(10)
-        xo=xo/c  #change of base rule
-    
-        x1=np.power(10,np.arange(xo-dx/2,xo-2,step=-dx))   
-        x2=np.power(10,np.arange(xo+dx/2,xo+2,step=dx))  
-    
-        fx1=c*2*K*np.multiply(x1,chi2.pdf(2*K*x1,2*K))
-        fx2=c*2*K*np.multiply(x2,chi2.pdf(2*K*x2,2*K))
-
-        sumfx=np.cumsum(fx1+fx2)*dx
-    
-        ii=np.where(sumfx>=gamma)[0][0]
-        ra=np.log10(x1[ii])
-        rb=np.log10(x2[ii])
-    
+    # solved with the chi-square cdf and memoized per (K, gamma), see src.spectra
+    ra, rb = spectra.confidence_interval_factors(K, gamma, scale=str)
     return ra,rb    
 
 
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+import src.spectra as spectra
+
+# mean radius of the earth in km
+EARTH_RADIUS = 6371.0
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    great circle distance in km between points given in degrees, the arguments are broadcast against each other
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+class CATSBarotropicTide:
+    """
+    Barotropic tidal velocities of the CATS2008 model at a set of model points.
+
+    The dataframe of data/CATS/cats_data.pickle has a "time" column and one column of complex velocities
+    in m/s per model point, named by the tuple (lat, lon). The multitaper spectra of all model points are
+    computed in one batched call per time-bandwidth product and the band energies are cached per band,
+    so that the barotropic energy of every mooring is a lookup of its nearest model point.
+    """
+
+    def __init__(self, cats_df, dt=1 / 24, precision="double"):
+        """
+        In:
+          cats_df                dataframe as in data/CATS/cats_data.pickle
+          dt = 1/24 [days]       time step of the model output, hourly
+          precision = "double"   see src.spectra.PRECISIONS
+        """
+        model_columns = [column for column in cats_df.columns if column != "time"]
+        self.coordinates = np.array([(lat, lon) for lat, lon in model_columns], dtype=float)
+        # integer column names, so the velocities can be passed to spectra.mooring_total_multitaper
+        self.velocities = pd.DataFrame(cats_df[model_columns].to_numpy(), columns=range(len(model_columns)))
+        self.dt = dt
+        self.precision = precision
+        self._spectra = {}
+        self._band_energies = {}
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    @classmethod
+    def from_pickle(cls, path, **kwargs):
+        return cls(pd.read_pickle(path), **kwargs)
+
+    def nearest_point(self, lat, lon, max_distance=None):
+        """
+        Index of the model point closest to (lat, lon)
+
+        In:
+          lat, lon               coordinates in degrees
+          max_distance = None    in km, raise a KeyError if the closest model point is farther away
+
+        Out:
+          index of the model point, its coordinates are self.coordinates[index]
+        """
+        distances = haversine_distance(lat, lon, self.coordinates[:, 0], self.coordinates[:, 1])
+        index = int(np.argmin(distances))
+        if max_distance is not None and distances[index] > max_distance:
+            raise KeyError(f"No CATS model point within {max_distance} km of ({lat}, {lon}), "
+                           f"the closest is {distances[index]:.1f} km away")
+        return index
+
+    def spectra(self, P=10):
+        """
+        Total multitaper velocity spectra of all model points, see src.spectra.total_multitaper
+
+        Out:
+          list of (freq [cpd], total_psd [m$^2$/s$^2$ days]) in the order of self.coordinates
+        """
+        if P not in self._spectra:
+            spectra_per_point = spectra.mooring_total_multitaper(
+                self.velocities, dt=self.dt, P=P, precision=self.precision
+            )
+            self._spectra[P] = list(spectra_per_point.values())
+        return self._spectra[P]
+
+    def band_energies(self, a, b, P=10):
+        """
+        Horizontal kinetic energy in m^2/s^2 between the frequencies a and b in cpd of all model points,
+        i.e. half the integral of the velocity spectrum, which yields the variance of the velocity
+        """
+        key = (float(a), float(b), float(P))
+        if key not in self._band_energies:
+            energies = [
+                spectra.PowerSpectrum(freq, total_psd / 2).integrate(a=a, b=b)
+                for freq, total_psd in self.spectra(P)
+            ]
+            self._band_energies[key] = np.array(energies, dtype=float)
+        return self._band_energies[key]
+
+    def band_energy(self, lat, lon, a, b, P=10, max_distance=None):
+        """
+        Horizontal kinetic energy in m^2/s^2 between a and b at the model point closest to (lat, lon),
+        see band_energies and nearest_point
+        """
+        return self.band_energies(a, b, P)[self.nearest_point(lat, lon, max_distance)]
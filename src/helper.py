@@ -118,8 +118,8 @@ class IO:
         data = data_struct["S"][0][0]
 
         matlab_time = np.squeeze(data["DATETIME"])
-        # convert Matlab variable "t" into list of python datetime objects
-        time = [matlab2datetime(tval) for tval in matlab_time]
+        # convert Matlab variable "t" into an array of datetime64
+        time = matlab2datetime64(matlab_time)
 
         u = np.squeeze(data["UC"])
         v = np.squeeze(data["VC"])
@@ -201,6 +201,25 @@ def matlab2datetime(matlab_datenum):
     dayfrac = dt.timedelta(days=matlab_datenum%1) - dt.timedelta(days = 366)
     return day + dayfrac
 
+# MATLAB datenum of 1970-01-01, datenums count days from the year 0
+MATLAB_DATENUM_UNIX_EPOCH = 719529
+
+def matlab2datetime64(matlab_datenum):
+    """
+    Vectorized matlab2datetime: array of MATLAB datenums to an array of datetime64[ns] of the same shape,
+    in one arithmetic pass instead of one Python datetime object per value.
+    Like matlab2datetime, the time of day is rounded to microseconds, NaNs become NaT.
+    Use .view("int64") for nanoseconds since 1970-01-01.
+    """
+    matlab_datenum = np.asarray(matlab_datenum, dtype=float)
+    is_valid = np.isfinite(matlab_datenum)
+    matlab_datenum = np.where(is_valid, matlab_datenum, MATLAB_DATENUM_UNIX_EPOCH)
+    # whole days and the fraction of the day separately, so that the days are exact integers
+    days = np.floor(matlab_datenum)
+    microseconds = np.round((matlab_datenum - days) * 86400e6)
+    nanoseconds = (days.astype(np.int64) - MATLAB_DATENUM_UNIX_EPOCH) * 86_400_000_000_000 + microseconds.astype(np.int64) * 1000
+    return np.where(is_valid, nanoseconds.view("datetime64[ns]"), np.datetime64("NaT", "ns"))
+
 def timedelta_to_list_of_ints(td):
     #returns days, hours, minutes, seconds as ints
     return td.days, td.seconds//3600, (td.seconds//60)%60, td.seconds%60
@@ -221,15 +240,27 @@ def pol2cart(rho, phi):
 #-------------------------------------------    
 class Data:
     @staticmethod
-    def cut_trailing_nans(array):
-        #if array has no nans, just return the input
-        if not np.any(np.isnan(array)):
-            return array  
+    def valid_length(array):
+        """
+        number of data points before the trailing NaN padding
+        """
+        is_nan = np.isnan(array)
+        #if array has no nans, all points are valid
+        if not np.any(is_nan):
+            return len(array)
 
-        first_nan_index = np.argmax(np.isnan(array)) 
+        first_nan_index = int(np.argmax(is_nan))
         assert first_nan_index != 0
         #Sanity check  
-        assert np.sum(np.isnan(array)) == len(array)-first_nan_index,"There seems to be more Nans outside the padding"
+        assert np.sum(is_nan) == len(array)-first_nan_index,"There seems to be more Nans outside the padding"
+        return first_nan_index
+
+    @staticmethod
+    def cut_trailing_nans(array):
+        #if array has no nans, just return the input
+        first_nan_index = Data.valid_length(array)
+        if first_nan_index == len(array):
+            return array  
         return array[:first_nan_index]
         
     def nan_helper(y):
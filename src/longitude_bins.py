@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+# half a degree longitude bins of the Joinville transect, see scripts/preprocessing/bin_coordinates.py
+BIN_EDGES = np.arange(-53.75, -46.25, 0.5)
+BIN_CENTER = BIN_EDGES[:-1] + 0.25
+
+
+def bin_by_longitude(df, statistic="mean", verbose=False):
+    """
+    Average (or another pandas statistic of) the profiles in each half degree longitude bin, row by row.
+    The columns of df are the profile longitudes, the columns of the result are the bin centers.
+
+    A bin starts at the profile closest to its left edge and ends before the profile closest to its right edge,
+    the last bin includes all profiles from its start on.
+
+    verbose = False prints the first and last profile longitude of each bin
+    """
+    lons = df.columns.to_numpy()
+    binned_df = pd.DataFrame(index=df.index)
+    for i, (edge, next_edge) in enumerate(zip(BIN_EDGES[:-1], BIN_EDGES[1:])):
+        start = np.argmin(np.abs(lons - edge))
+        stop = np.argmin(np.abs(lons - next_edge))
+        center = BIN_CENTER[i]
+        if verbose:
+            print(start, stop, f"{lons[start]:.2f}, {center}, {lons[stop]:.2f}")
+
+        assert lons[start] <= center
+        if i != len(BIN_CENTER) - 1:
+            assert lons[stop] >= center
+            binned_df[f"{center}"] = getattr(df.iloc[:, start:stop], statistic)(axis="columns")
+        else:  # including the rightmost edge
+            binned_df[f"{center}"] = getattr(df.iloc[:, start:], statistic)(axis="columns")
+    return binned_df
+
+
+def binned_std(df):
+    """
+    Standard deviation between the profiles in each longitude bin, row by row, see bin_by_longitude.
+
+    Bins with a single profile in a row, for which the sample standard deviation is undefined, get the pooled
+    standard deviation of all bins of that row with at least two profiles, or, if there are none, of the whole df.
+    Only rows without any profile in a bin stay NaN.
+    """
+    counts = bin_by_longitude(df, statistic="count")
+    variances = bin_by_longitude(df, statistic="var")
+    degrees_of_freedom = (counts - 1).clip(lower=0)
+    weighted_variances = (degrees_of_freedom * variances).where(degrees_of_freedom > 0, 0)
+
+    row_pooled_variance = weighted_variances.sum(axis="columns") / degrees_of_freedom.sum(axis="columns")
+    total_pooled_variance = weighted_variances.to_numpy().sum() / degrees_of_freedom.to_numpy().sum()
+    pooled_variance = row_pooled_variance.fillna(total_pooled_variance)
+
+    variances = variances.where(counts != 1, np.broadcast_to(pooled_variance.to_numpy()[:, None], variances.shape))
+    return np.sqrt(variances)
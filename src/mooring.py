@@ -1,5 +1,7 @@
 import pandas as pd
 
+import src.spectra as spectra
+
 @pd.api.extensions.register_dataframe_accessor("oze")
 class Mooring(pd.DataFrame):
 
@@ -22,4 +24,17 @@ class Mooring(pd.DataFrame):
         Assumes the names of the columns can be converted to numbers
         """
         deepest_depth = max([int(col) for col in self.columns[1:]])
-        return self[str(deepest_depth)]    
+        return self[str(deepest_depth)]
+
+    def with_precision(self, precision="double"):
+        """
+        Copy with all velocity columns cast to the floating point types of the precision mode
+        ("double" or "single", see src.spectra.PRECISIONS), the "time" column is kept as it is.
+        Single precision halves the memory of complex velocities.
+        """
+        real_type, complex_type = spectra.PRECISIONS[precision]
+        dtypes = {
+            column: complex_type if pd.api.types.is_complex_dtype(self[column]) else real_type
+            for column in self.columns if column != "time"
+        }
+        return self.astype(dtypes)
@@ -0,0 +1,163 @@
+import numpy as np
+import scipy.special
+from scipy.optimize import curve_fit
+
+# initial guesses of the nonlinear fits, as used before the log-linear fit was introduced
+NONLINEAR_INITIAL_SLOPE = -2
+NONLINEAR_INITIAL_PREFACTOR = 1e4
+
+
+def stack_bands(freqs, psds):
+    """
+    Stack frequency bands of different lengths into NaN-padded arrays of shape (n_bands, max_length),
+    e.g. the fitting ranges of several instruments, whose upper ends are set by different N.
+    """
+    max_length = max(len(freq) for freq in freqs)
+    stacked_freq = np.full((len(freqs), max_length), np.nan)
+    stacked_psd = np.full((len(psds), max_length), np.nan)
+    for i, (freq, psd) in enumerate(zip(freqs, psds)):
+        stacked_freq[i, :len(freq)] = freq
+        stacked_psd[i, :len(psd)] = psd
+    return stacked_freq, stacked_psd
+
+
+def _log_bias(dof):
+    """
+    expected value of log(S_estimate / S) for a chi-squared distributed spectral estimate with dof degrees of freedom
+    """
+    return scipy.special.digamma(dof / 2) - np.log(dof / 2)
+
+
+def _log_space_sums(freq, psd, weights):
+    """
+    log-transformed data and weighted sums, NaNs in freq or psd get zero weight
+    """
+    freq, psd = np.broadcast_arrays(np.asarray(freq, dtype=float), np.asarray(psd, dtype=float))
+    weights = np.ones_like(psd) if weights is None else np.broadcast_to(np.asarray(weights, dtype=float), psd.shape)
+    is_valid = np.isfinite(freq) & np.isfinite(psd) & (freq > 0) & (psd > 0)
+    weights = np.where(is_valid, weights, 0.0)
+    x = np.log(np.where(is_valid, freq, 1.0))
+    y = np.log(np.where(is_valid, psd, 1.0))
+    return x, y, weights, np.sum(is_valid, axis=-1)
+
+
+def fit_power_law(freq, psd, weights=None, dof=None, method="log-linear"):
+    """
+    Fit psd = c * freq^s to one or many spectra at once.
+
+    The default method is a weighted linear regression of log(psd) on log(freq), solved in closed form
+    for all spectra along the last axis, with the standard analytic uncertainties scaled by the residuals.
+    method="nonlinear" instead calls scipy.optimize.curve_fit for each spectrum on the linear values.
+
+    In:
+      freq                   array of shape (n,) or (..., n), NaNs mark unused points, e.g. from stack_bands
+      psd                    array of shape (..., n), NaNs mark unused points
+      weights = None         optional weights of the log-linear fit, broadcastable to psd
+      dof = None             degrees of freedom of the spectral estimates, if given the prefactor of the
+                             log-linear fit is corrected for the bias of the logarithm of a chi-squared variable
+      method = "log-linear"  or "nonlinear"
+
+    Out:
+      slope, slope_error, prefactor, prefactor_error    arrays of shape psd.shape[:-1], errors are one standard deviation
+    """
+    if method == "nonlinear":
+        return _fit_nonlinear(freq, psd)
+    if method != "log-linear":
+        raise ValueError(f"method = {method!r} has to be 'log-linear' or 'nonlinear'")
+
+    x, y, w, n_valid = _log_space_sums(freq, psd, weights)
+    Sw = np.sum(w, axis=-1)
+    Sx = np.sum(w * x, axis=-1)
+    Sy = np.sum(w * y, axis=-1)
+    Sxx = np.sum(w * x ** 2, axis=-1)
+    Sxy = np.sum(w * x * y, axis=-1)
+    determinant = Sw * Sxx - Sx ** 2
+
+    slope = (Sw * Sxy - Sx * Sy) / determinant
+    intercept = (Sxx * Sy - Sx * Sxy) / determinant
+    # residual variance, as curve_fit does with absolute_sigma=False
+    residuals = y - (intercept[..., None] + slope[..., None] * x)
+    residual_variance = np.sum(w * residuals ** 2, axis=-1) / (n_valid - 2)
+    slope_error = np.sqrt(residual_variance * Sw / determinant)
+    intercept_error = np.sqrt(residual_variance * Sxx / determinant)
+
+    if dof is not None:
+        intercept = intercept - _log_bias(dof)
+    prefactor = np.exp(intercept)
+    return slope, slope_error, prefactor, prefactor * intercept_error
+
+
+def fit_power_law_prefactor(freq, psd, slope, weights=None, dof=None, method="log-linear"):
+    """
+    Fit only the prefactor c of psd = c * freq^slope for given slopes.
+
+    In:
+      slope                  scalar or array of shape psd.shape[:-1]
+      freq, psd, weights, dof, method    see fit_power_law
+
+    Out:
+      prefactor, prefactor_error
+    """
+    if method == "nonlinear":
+        return _fit_nonlinear(freq, psd, slope=slope)
+    if method != "log-linear":
+        raise ValueError(f"method = {method!r} has to be 'log-linear' or 'nonlinear'")
+
+    x, y, w, n_valid = _log_space_sums(freq, psd, weights)
+    slope = np.asarray(slope, dtype=float)
+    Sw = np.sum(w, axis=-1)
+    intercept = np.sum(w * (y - slope[..., None] * x), axis=-1) / Sw
+    residuals = y - (intercept[..., None] + slope[..., None] * x)
+    residual_variance = np.sum(w * residuals ** 2, axis=-1) / (n_valid - 1)
+    intercept_error = np.sqrt(residual_variance / Sw)
+
+    if dof is not None:
+        intercept = intercept - _log_bias(dof)
+    prefactor = np.exp(intercept)
+    return prefactor, prefactor * intercept_error
+
+
+def integrate_power_law(prefactor, slope, a, b):
+    """
+    Closed-form integral of c * freq^s from a to b, c/(s+1) * (b^(s+1) - a^(s+1)), or c * log(b/a) for s = -1.
+    All arguments are broadcast against each other, e.g. to integrate several instruments and error bounds at once.
+    """
+    prefactor, slope, a, b = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (prefactor, slope, a, b)))
+    exponent = slope + 1
+    is_logarithmic = np.isclose(exponent, 0, rtol=0, atol=1e-12)
+    # expm1 keeps the precision for exponents close to -1
+    log_a, log_b = np.log(a), np.log(b)
+    safe_exponent = np.where(is_logarithmic, 1.0, exponent)
+    power_integral = (np.exp(exponent * log_a) * np.expm1(exponent * (log_b - log_a))) / safe_exponent
+    return prefactor * np.where(is_logarithmic, log_b - log_a, power_integral)
+
+
+def _fit_nonlinear(freq, psd, slope=None):
+    """
+    curve_fit on the linear values for each spectrum, with the slope as free parameter if slope is None
+    """
+    freq, psd = np.broadcast_arrays(np.asarray(freq, dtype=float), np.asarray(psd, dtype=float))
+    batch_shape = psd.shape[:-1]
+    freq = freq.reshape(-1, freq.shape[-1])
+    psd = psd.reshape(-1, psd.shape[-1])
+    slopes = None if slope is None else np.broadcast_to(np.asarray(slope, dtype=float), batch_shape).ravel()
+
+    results = []
+    for i, (x, y) in enumerate(zip(freq, psd)):
+        is_valid = np.isfinite(x) & np.isfinite(y)
+        x, y = x[is_valid], y[is_valid]
+        if slopes is None:
+            def func_powerlaw(x, s, c):
+                return x ** s * c
+
+            popt, pcov = curve_fit(func_powerlaw, x, y, p0=np.asarray([NONLINEAR_INITIAL_SLOPE, NONLINEAR_INITIAL_PREFACTOR]))
+            perr = np.sqrt(np.diag(pcov))
+            results.append((popt[0], perr[0], popt[1], perr[1]))
+        else:
+            def func_powerlaw_fixed_slope(x, c, s=slopes[i]):
+                return x ** s * c
+
+            popt, pcov = curve_fit(func_powerlaw_fixed_slope, x, y, p0=np.asarray([NONLINEAR_INITIAL_PREFACTOR]))
+            results.append((popt[0], np.sqrt(pcov[0, 0])))
+
+    return tuple(np.reshape(values, batch_shape) for values in zip(*results))
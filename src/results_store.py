@@ -0,0 +1,120 @@
+import json
+import operator
+import pathlib
+
+import numpy as np
+
+# version of the layout of schema.json, increased for incompatible changes
+SCHEMA_VERSION = 1
+SCHEMA_FILE = "schema.json"
+
+FILTER_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": np.isin,
+}
+
+
+def write_results(path, columns, units, descriptions=None):
+    """
+    Write a typed columnar results table: one .npy file per column and a schema.json,
+    which records the schema version, number of rows, and dtype, unit and description of every column.
+    Only numeric, boolean and fixed-length string columns are allowed, so no reader needs pickle.
+
+    In:
+      path                   directory of the table, created if necessary
+      columns                structured array or dictionary {name: 1D array}, all of the same length
+      units                  dictionary {name: unit}, required for every column, "" for dimensionless
+      descriptions = None    optional dictionary {name: description}
+    """
+    path = pathlib.Path(path)
+    if isinstance(columns, np.ndarray) and columns.dtype.names is not None:
+        columns = {name: columns[name] for name in columns.dtype.names}
+    columns = {name: np.ascontiguousarray(values) for name, values in columns.items()}
+    descriptions = {} if descriptions is None else descriptions
+
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"All columns must have the same length, got {sorted(lengths)}")
+    missing_units = [name for name in columns if name not in units]
+    if missing_units:
+        raise ValueError(f"No units given for {missing_units}")
+    for name, values in columns.items():
+        if values.ndim != 1 or values.dtype.kind not in "biufcUS":
+            raise TypeError(f"Column {name!r} of dtype {values.dtype} and shape {values.shape} cannot be stored")
+
+    path.mkdir(parents=True, exist_ok=True)
+    for name, values in columns.items():
+        np.save(path / f"{name}.npy", values, allow_pickle=False)
+    schema = {
+        "schema_version": SCHEMA_VERSION,
+        "n_rows": lengths.pop() if lengths else 0,
+        "columns": {
+            name: {"dtype": values.dtype.str, "unit": units[name], "description": descriptions.get(name, "")}
+            for name, values in columns.items()
+        },
+    }
+    with open(path / SCHEMA_FILE, "w") as f:
+        json.dump(schema, f, indent=2)
+
+
+def read_schema(path):
+    """
+    schema.json of a results table, see write_results
+    """
+    with open(pathlib.Path(path) / SCHEMA_FILE) as f:
+        schema = json.load(f)
+    if schema["schema_version"] > SCHEMA_VERSION:
+        raise ValueError(f"Schema version {schema['schema_version']} is newer than the supported version {SCHEMA_VERSION}")
+    return schema
+
+
+def read_results(path, columns=None, filters=None, mmap_mode="r"):
+    """
+    Read columns of a results table, optionally only the rows matching all filters.
+
+    In:
+      path                   directory of the table, see write_results
+      columns = None         names of the columns to read, default is all columns
+      filters = None         list of (column, operator, value) predicates, which all have to be true,
+                             operators are ==, !=, <, <=, >, >= and "in", e.g. [("mab", "<", 500)]
+      mmap_mode = "r"        the columns are memory-mapped and only the selected rows are copied.
+                             None reads the columns into memory
+
+    Out:
+      dictionary {name: array} in the order of columns
+    """
+    path = pathlib.Path(path)
+    schema = read_schema(path)
+    if columns is None:
+        columns = list(schema["columns"])
+    unknown_columns = [name for name in columns if name not in schema["columns"]]
+    if unknown_columns:
+        raise KeyError(f"Unknown columns {unknown_columns}")
+
+    def load(name):
+        # empty files cannot be memory-mapped
+        values = np.load(path / f"{name}.npy", mmap_mode=mmap_mode if schema["n_rows"] else None, allow_pickle=False)
+        assert values.dtype == np.dtype(schema["columns"][name]["dtype"])
+        return values
+
+    if not filters:
+        return {name: load(name) for name in columns}
+
+    mask = np.ones(schema["n_rows"], dtype=bool)
+    for name, op, value in filters:
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unknown filter operator {op!r}, valid are {list(FILTER_OPERATORS)}")
+        mask &= FILTER_OPERATORS[op](load(name), value)
+    return {name: load(name)[mask] for name in columns}
+
+
+def read_units(path):
+    """
+    dictionary {column name: unit} of a results table
+    """
+    return {name: column["unit"] for name, column in read_schema(path)["columns"].items()}
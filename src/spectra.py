@@ -1,30 +1,692 @@
+import functools
+import hashlib
+import pathlib
+import warnings
+
 import numpy as np
+import scipy.fft
+import scipy.integrate
+import scipy.signal as sg
+import scipy.special
+
+import src.helper as helper
+
+# number of (N, NW, K) taper sets kept in memory
+TAPER_CACHE_SIZE = 32
+# settings of the adaptive weighting, the same as in German Prieto's multitaper package
+ADAPTIVE_MAX_ITERATIONS = 1000
+ADAPTIVE_TOLERANCE = 9.5e-7
+# bisection steps for the confidence intervals, enough to reach double precision
+CONFIDENCE_BISECTION_STEPS = 60
+# number of (K, confidence level, scale) combinations with memorized confidence intervals
+CONFIDENCE_CACHE_SIZE = 4096
+# number of (frequency grid, P, tidal constituents) combinations with memorized peak intervals
+TIDAL_PEAK_CACHE_SIZE = 256
+# floating point types of the real and complex arrays of each precision mode
+PRECISIONS = {
+    "double": (np.float64, np.complex128),
+    "single": (np.float32, np.complex64),
+}
+
+
+@functools.lru_cache(maxsize=TAPER_CACHE_SIZE)
+def _taper_bank(N, NW, K, cache_dir):
+    # the disk cache is only consulted when the taper set is not already held in memory
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = pathlib.Path(cache_dir) / f"dpss_N{N}_NW{NW:g}_K{K}.npz"
+        if cache_file.exists():
+            with np.load(cache_file) as data:
+                tapers, eigenvalues = data["tapers"], data["eigenvalues"]
+            tapers.setflags(write=False)
+            eigenvalues.setflags(write=False)
+            return tapers, eigenvalues
+
+    # tapers are returned with shape (K, N) and unit energy
+    tapers, eigenvalues = sg.windows.dpss(N, NW, Kmax=K, sym=True, norm=2, return_ratios=True)
+    tapers = np.atleast_2d(tapers)
+    eigenvalues = np.atleast_1d(eigenvalues)
+
+    if cache_file is not None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_file, tapers=tapers, eigenvalues=eigenvalues)
+
+    # cached arrays are shared between all callers and must not be altered
+    tapers.setflags(write=False)
+    eigenvalues.setflags(write=False)
+    return tapers, eigenvalues
+
+
+def get_dpss_tapers(N, NW=10, K=None, cache_dir=None):
+    """
+    Slepian tapers (DPSS) and their concentration eigenvalues.
+
+    The eigenproblem is solved only once per (N, NW, K). The results are kept in a bounded
+    LRU cache and, if cache_dir is given, additionally stored as .npz files in that directory.
+
+    In:
+      N                      number of data points
+      NW = 10                time_bandwidth_product, P in the rest of this module
+      K = None               number of tapers, default is 2*NW-1
+      cache_dir = None       optional directory for persisting the tapers between runs
+
+    Out:
+      tapers                 read-only array of shape (K, N)
+      eigenvalues            read-only array of shape (K,)
+    """
+    if K is None:
+        K = int(np.round(2 * NW - 1))
+    if cache_dir is not None:
+        cache_dir = str(cache_dir)
+    return _taper_bank(int(N), float(NW), int(K), cache_dir)
+
+
+def clear_taper_cache():
+    """Empty the in-memory taper bank, files in a cache_dir are kept."""
+    _taper_bank.cache_clear()
+
+
+def as_precision(array, precision="double"):
+    """
+    array cast to the real or complex floating point type of the precision mode ("double" or "single"),
+    without a copy if it already has that type
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision = {precision!r} has to be one of {list(PRECISIONS)}")
+    real_type, complex_type = PRECISIONS[precision]
+    array = np.asarray(array)
+    return array.astype(complex_type if np.iscomplexobj(array) else real_type, copy=False)
+
+
+def _weights_to_dof(weights):
+    """
+    degrees of freedom per frequency from the adaptive weights (..., K, nfft),
+    following utils.wt2dof of German Prieto's multitaper package
+    """
+    K = np.shape(weights)[-2]
+    normalization = np.sqrt(np.sum(weights ** 2, axis=-2, keepdims=True) / K)
+    return 2.0 * np.sum(np.minimum(weights / normalization, 1.0) ** 2, axis=-2)
 
-def total_multitaper(complex_velocity,dt = 1/12,P=10):
-    # using German Prieto's multitaper package, https://github.com/gaprieto/multitaper,
-    # but it required manual debugging and changing of np.int() to int()
-    from multitaper import MTSpec
-
-    spec = MTSpec(complex_velocity-np.mean(complex_velocity), nw=P, dt=dt, iadapt=0, nfft=len(complex_velocity))
-    S = np.ravel(spec.spec)
-    f = np.ravel(spec.freq)
-    # add positive and negative frequencies to a total PSD
-    # negative side has to be reversed to align with the positive side
-    # if len(S) is even, the last data point is removed
-    if len(S)%2 ==0:
-        #print("even",np.shape(S[np.where(f < 0)]), np.shape(S[np.where(f > 0)]))
-        freq = f[np.where(f > 0)][:-1]
-        total_psd = S[np.where(f<0)][::-1] + S[np.where(f>0)][:-1]
 
+def _adaptive_weighting(sk, eigenvalues, tolerance=ADAPTIVE_TOLERANCE):
+    """
+    Thomson's adaptive weighting of the eigenspectra sk (n_series, K, nfft),
+    following utils.adaptspec of German Prieto's multitaper package.
+    All frequencies and series are iterated together, but every series stops
+    as soon as its largest relative change is below the tolerance.
+
+    Returns the adaptive spectra and their degrees of freedom, both of shape (n_series, nfft)
+    """
+    n_series, K, nfft = np.shape(sk)
+    # frequency sampling as in the multitaper package
+    df = 1.0 / (nfft - 1)
+    # broad band bias of each eigenspectrum, eq 5.1b in Thomson, 1982
+    variance = np.mean(np.sum(sk, axis=-1) * df, axis=-1)
+    bias = variance[:, None] * (1.0 - eigenvalues)[None, :]
+    sqrt_eigenvalues = np.sqrt(eigenvalues)
+
+    spec = (sk[:, 0] + sk[:, 1]) / 2.0
+    dof = np.empty_like(spec)
+    active = np.arange(n_series)
+    active_sk, active_bias = sk, bias
+    for _ in range(ADAPTIVE_MAX_ITERATIONS):
+        last_spec = spec[active]
+        weights = np.minimum(
+            sqrt_eigenvalues[None, :, None] * last_spec[:, None, :]
+            / (eigenvalues[None, :, None] * last_spec[:, None, :] + active_bias[:, :, None]),
+            1.0
+        )
+        squared_weights = weights ** 2
+        new_spec = np.sum(squared_weights * active_sk, axis=1) / np.sum(squared_weights, axis=1)
+        spec[active] = new_spec
+
+        converged = np.max(np.abs((new_spec - last_spec) / (new_spec + last_spec)), axis=-1) <= tolerance
+        if np.any(converged):
+            dof[active[converged]] = _weights_to_dof(weights[converged])
+        if np.all(converged):
+            break
+        if np.any(converged):
+            active = active[~converged]
+            active_sk, active_bias = sk[active], bias[active]
     else:
-        #print("odd",np.shape(S[np.where(f<0)]), np.shape(S[np.where(f>0)]))
-        freq = f[np.where(f > 0)]
-        total_psd = S[np.where(f<0)][::-1] + S[np.where(f>0)]
+        warnings.warn(f"Adaptive weighting did not converge for {len(active)} of {n_series} time series")
+        dof[active] = _weights_to_dof(weights[~converged])
+    return spec, dof
+
+
+def _fold_to_rotary_psd(freq, S):
+    """
+    split a two-sided spectrum of u+iv into its rotary components,
+    negative frequencies rotate clockwise, positive ones counterclockwise
+    """
+    nfft = np.shape(S)[-1]
+    n_pairs = (nfft - 1) // 2
+    clockwise_psd = S[..., nfft - 1:nfft - n_pairs - 1:-1]
+    counterclockwise_psd = S[..., 1:n_pairs + 1]
+    return freq[1:n_pairs + 1], clockwise_psd, counterclockwise_psd
+
+
+def _fold_to_total_psd(freq, S):
+    """
+    add positive and negative frequencies to a total PSD,
+    the zero frequency and, for even lengths, the Nyquist frequency are dropped
+    """
+    freq, clockwise_psd, counterclockwise_psd = _fold_to_rotary_psd(freq, S)
+    return freq, clockwise_psd + counterclockwise_psd
+
+
+def _fold_to_total_dof(S, dof):
+    """
+    degrees of freedom of the total PSD, i.e. of the sum of the positive and negative
+    frequency estimates, with the Welch-Satterthwaite approximation
+    """
+    _freq, S_negative, S_positive = _fold_to_rotary_psd(np.empty(np.shape(S)[-1]), S)
+    _freq, dof_negative, dof_positive = _fold_to_rotary_psd(np.empty(np.shape(S)[-1]), dof)
+    return (S_negative + S_positive) ** 2 / (S_negative ** 2 / dof_negative + S_positive ** 2 / dof_positive)
+
 
-    #print(np.shape(freq), np.shape(total_psd))
+def _eigencoefficients(block, P, cache_dir=None, nfft=None, precision="double"):
+    """
+    Tapered FFTs of a block of equally long time series with shape (n_series, N).
+    Returns the demeaned block, the eigencoefficients (n_series, K, nfft) and the taper eigenvalues.
+    """
+    block = as_precision(block, precision)
+    block = block - np.mean(block, axis=-1, keepdims=True)
+    n_series, N = np.shape(block)
+    if nfft is None:
+        nfft = N
+    if nfft < N:
+        raise ValueError(f"nfft = {nfft} must not be smaller than the length of the time series ({N})")
+
+    tapers, eigenvalues = get_dpss_tapers(N, NW=P, cache_dir=cache_dir)
+    tapers, eigenvalues = as_precision(tapers, precision), as_precision(eigenvalues, precision)
+    # tapered block of shape (n_series, K, N)
+    eigencoefficients = scipy.fft.fft(tapers[None, :, :] * block[:, None, :], n=nfft, axis=-1)
+    return block, eigencoefficients, eigenvalues
+
+
+def _multitaper_block(block, dt, P, cache_dir=None, tolerance=ADAPTIVE_TOLERANCE, nfft=None, precision="double"):
+    """
+    Adaptive multitaper spectra of a block of equally long time series with shape (n_series, N).
+    All series are tapered together and transformed in a single FFT call,
+    zero-padded to nfft points if nfft is larger than N.
+    With precision="single", tapering, FFT and adaptive weighting run in float32/complex64,
+    only the sum of the spectrum for the variance normalization is accumulated in double precision.
+    Returns the frequencies, the two-sided spectra and their degrees of freedom.
+    """
+    block, eigencoefficients, eigenvalues = _eigencoefficients(block, P, cache_dir, nfft, precision)
+    nfft = np.shape(eigencoefficients)[-1]
+    S, dof = _adaptive_weighting(np.abs(eigencoefficients) ** 2, eigenvalues, tolerance=tolerance)
+
+    # scale the spectra, so that their integrals recover the variance of each time series
+    df = 1 / (nfft * dt)
+    normalization = np.var(block, axis=-1) / (np.sum(S, axis=-1, dtype=np.float64) * df)
+    S = S * as_precision(normalization, precision)[:, None]
+    return scipy.fft.fftfreq(nfft, dt), S, dof
+
+
+def adaptive_multitaper(time_series, dt=1 / 12, P=10, tolerance=ADAPTIVE_TOLERANCE, total=True, cache_dir=None,
+                        precision="double"):
+    """
+    Adaptive (Thomson) multitaper spectra with degrees of freedom per frequency.
+
+    Several equally long time series can be passed as rows of a 2D array. Their adaptive
+    weights are iterated together for all frequencies, which avoids the per-series overhead
+    of the multitaper package.
+
+    In:
+      time_series            array of shape (N,) or (n_series, N), real or complex
+      dt = 1/12 [days]       time duration between measurements
+      P = 10                 time_bandwidth_product
+      tolerance              convergence criterion for the largest relative change of the spectrum
+      total = True           if True, return the total PSD (positive + negative frequencies) like total_multitaper,
+                             otherwise the two-sided spectrum in FFT order
+      cache_dir = None       optional directory to persist the tapers, see get_dpss_tapers
+      precision = "double"   "single" computes in float32/complex64, see total_multitaper
+
+    Out:
+      freq [cpd]
+      psd                    with the shape of time_series along the frequency axis
+      dof                    degrees of freedom of each psd value
+    """
+    time_series = np.asarray(time_series)
+    block = np.atleast_2d(time_series)
+    f, S, dof = _multitaper_block(block, dt=dt, P=P, cache_dir=cache_dir, tolerance=tolerance, precision=precision)
+
+    if total:
+        dof = _fold_to_total_dof(S, dof)
+        f, S = _fold_to_total_psd(f, S)
+
+    if time_series.ndim == 1:
+        return f, S[0], dof[0]
+    return f, S, dof
+
+
+def rotary_multitaper(complex_velocity, dt=1 / 12, P=10, rotary_coefficient=False, cache_dir=None, precision="double"):
+    """
+    Total, clockwise and counterclockwise PSDs from a single set of tapered FFTs.
+
+    The rotary spectra are the two halves of the adaptive two-sided spectrum of u+iv,
+    so that clockwise_psd + counterclockwise_psd is exactly the total_psd of total_multitaper.
+
+    In:
+      complex_velocity       array of shape (N,) or (n_series, N)
+      dt, P, cache_dir       see total_multitaper
+      precision              see total_multitaper
+      rotary_coefficient     if True, additionally return (cw - ccw) / (cw + ccw),
+                             which is +1 for purely clockwise and -1 for purely counterclockwise motion
+
+    Out:
+      freq [cpd]
+      total_psd, clockwise_psd, counterclockwise_psd [m$^2$/s$^2$ days]
+      (rotary coefficient)
+    """
+    complex_velocity = np.asarray(complex_velocity)
+    f, S, _dof = _multitaper_block(np.atleast_2d(complex_velocity), dt=dt, P=P, cache_dir=cache_dir,
+                                   precision=precision)
+    freq, clockwise_psd, counterclockwise_psd = _fold_to_rotary_psd(f, S)
+    if complex_velocity.ndim == 1:
+        clockwise_psd, counterclockwise_psd = clockwise_psd[0], counterclockwise_psd[0]
+    total_psd = clockwise_psd + counterclockwise_psd
+
+    if rotary_coefficient:
+        coefficient = (clockwise_psd - counterclockwise_psd) / total_psd
+        return freq, total_psd, clockwise_psd, counterclockwise_psd, coefficient
+    return freq, total_psd, clockwise_psd, counterclockwise_psd
+
+
+def total_multitaper(complex_velocity, dt=1 / 12, P=10, cache_dir=None, precision="double"):
+    """
+    Adaptive multitaper estimate of the total (positive + negative frequencies) PSD.
+
+    Equivalent to German Prieto's multitaper package, https://github.com/gaprieto/multitaper,
+    called as MTSpec(x, nw=P, dt=dt, iadapt=0, nfft=len(x)), but the tapers come from the
+    cached taper bank, so that repeated calls with the same length skip the eigenproblem.
+
+    In:
+      complex_velocity [m/s] technically the unit is arbitrary, the psd will just reflect the original unit
+      dt = 1/12 [days]       time duration between measurements, unit is chosen to produce cpd frequency
+      P = 10                 time_bandwidth_product, determines the smoothing
+      cache_dir = None       optional directory to persist the tapers, see get_dpss_tapers
+      precision = "double"   "single" tapers and transforms in float32/complex64, which halves the memory
+                             of the tapered block. For a 1-year record at dt = 1/12 the total PSD deviates
+                             from the double precision result by less than 1e-4 relative, see
+                             tests/test_spectra.py
+
+    Out:
+      freq [cpd]
+      total_psd [m$^2$/s$^2$ days]
+    """
+    f, S, _dof = _multitaper_block(np.asarray(complex_velocity)[None, :], dt=dt, P=P, cache_dir=cache_dir,
+                                   precision=precision)
+    freq, total_psd = _fold_to_total_psd(f, S[0])
     assert np.all(np.shape(freq) == np.shape(total_psd))
     return freq, total_psd
- 
+
+
+def segmented_total_multitaper(time_series, segment_length, dt=1 / 12, P=10, overlap=0.5, nfft=None,
+                                segments_per_batch=4, cache_dir=None, precision="double"):
+    """
+    Total multitaper PSD averaged over overlapping segments of a long record.
+
+    Segments are read one batch at a time, so that memory use is bounded by
+    segments_per_batch * K * nfft and not by the length of the record. The record can
+    therefore be a np.memmap, any other array-like supporting slicing, or the path to an
+    .npy file, which is then memory-mapped. Segments containing NaNs are skipped.
+
+    In:
+      time_series            array-like or path to an .npy file, real or complex
+      segment_length         number of data points per segment
+      dt = 1/12 [days]       time duration between measurements
+      P = 10                 time_bandwidth_product of each segment
+      overlap = 0.5          fraction of overlap between neighbouring segments
+      nfft = None            FFT length and therefore frequency grid, default is segment_length.
+                             Larger values interpolate the spectrum on a finer grid by zero-padding.
+      segments_per_batch = 4 number of segments tapered and transformed together
+      cache_dir = None       optional directory to persist the tapers, see get_dpss_tapers
+      precision = "double"   "single" computes in float32/complex64, see total_multitaper
+
+    Out:
+      freq [cpd]
+      total_psd              mean over all valid segments
+      n_segments             number of averaged segments
+    """
+    if isinstance(time_series, (str, pathlib.Path)):
+        time_series = np.load(time_series, mmap_mode="r")
+
+    record_length = len(time_series)
+    segment_length = int(segment_length)
+    if segment_length > record_length:
+        raise ValueError(f"segment_length = {segment_length} is longer than the record ({record_length})")
+    if not 0 <= overlap < 1:
+        raise ValueError(f"overlap = {overlap} has to be in [0, 1)")
+    step = max(1, int(round(segment_length * (1 - overlap))))
+    starts = range(0, record_length - segment_length + 1, step)
+
+    sum_of_psds = None
+    n_segments = 0
+    for batch_index in range(0, len(starts), segments_per_batch):
+        batch = [
+            np.asarray(time_series[start:start + segment_length])
+            for start in starts[batch_index:batch_index + segments_per_batch]
+        ]
+        batch = [segment for segment in batch if not np.any(np.isnan(segment))]
+        if not batch:
+            continue
+
+        f, S, _dof = _multitaper_block(np.stack(batch), dt=dt, P=P, cache_dir=cache_dir, nfft=nfft,
+                                       precision=precision)
+        freq, total_psds = _fold_to_total_psd(f, S)
+        batch_sum = np.sum(total_psds, axis=0)
+        sum_of_psds = batch_sum if sum_of_psds is None else sum_of_psds + batch_sum
+        n_segments += len(batch)
+
+    if n_segments == 0:
+        raise ValueError("No segment without NaNs found")
+    return freq, sum_of_psds / n_segments, n_segments
+
+
+def multitaper_spectrogram(complex_velocity, window_length, step=None, dt=1 / 12, P=10, time=None,
+                           windows_per_batch=16, cache_dir=None, precision="double"):
+    """
+    Sliding-window total multitaper PSDs of a time series.
+
+    The windows are strided views of the time series. All windows share one taper set from the
+    taper bank and are transformed in batches of windows_per_batch with a single FFT call each.
+    Windows containing NaNs get a row of NaNs, so that the time axis stays regular.
+
+    In:
+      complex_velocity       time series of shape (N,)
+      window_length          number of data points per window
+      step = None            number of data points between window starts, default is half a window
+      dt, P, cache_dir       see total_multitaper, P applies to each window
+      precision              see total_multitaper, "single" also stores the spectrogram as float32
+      time = None            optional time axis of the time series, used for the window centers
+
+    Out:
+      window_time            center of each window, either from time or as index of the time series
+      freq [cpd]
+      spectrogram            total PSD per window with shape (n_windows, n_freq)
+    """
+    complex_velocity = as_precision(complex_velocity, precision)
+    window_length = int(window_length)
+    if step is None:
+        step = max(1, window_length // 2)
+    if window_length > len(complex_velocity):
+        raise ValueError(f"window_length = {window_length} is longer than the time series ({len(complex_velocity)})")
+
+    windows = np.lib.stride_tricks.sliding_window_view(complex_velocity, window_length)[::step]
+    n_windows = len(windows)
+    center_indices = np.arange(n_windows) * step + window_length // 2
+    window_time = center_indices if time is None else np.asarray(time)[center_indices]
+
+    is_valid = ~np.any(np.isnan(windows), axis=-1)
+    valid_indices = np.flatnonzero(is_valid)
+    freq, _ = _fold_to_total_psd(scipy.fft.fftfreq(window_length, dt), np.empty(window_length))
+    spectrogram = np.full((n_windows, len(freq)), np.nan, dtype=PRECISIONS[precision][0])
+
+    for batch_start in range(0, len(valid_indices), windows_per_batch):
+        batch_indices = valid_indices[batch_start:batch_start + windows_per_batch]
+        f, S, _dof = _multitaper_block(windows[batch_indices], dt=dt, P=P, cache_dir=cache_dir,
+                                       precision=precision)
+        spectrogram[batch_indices] = _fold_to_total_psd(f, S)[1]
+
+    return window_time, freq, spectrogram
+
+
+def spectrogram_band_energies(freq, spectrogram, bands, edges="nearest"):
+    """
+    Time series of band energies from a spectrogram, via the cumulative integral of PowerSpectrum.
+
+    In:
+      freq, spectrogram      see multitaper_spectrogram
+      bands                  dictionary {name: (a, b)} of band edges, a and b may be arrays of
+                             several intervals, e.g. the tidal peaks, whose energies are summed up
+      edges = "nearest"      see PowerSpectrum.integrate
+
+    Out:
+      dictionary {name: band energy per window}
+    """
+    spectra = PowerSpectrum(freq, spectrogram)
+    band_energies = {}
+    for name, (a, b) in bands.items():
+        a, b = np.atleast_1d(a), np.atleast_1d(b)
+        energies = spectra.integrate(a, b, edges=edges)
+        band_energies[name] = np.sum(energies, axis=-1)
+    return band_energies
+
+
+def mooring_total_multitaper(mooring, dt=1 / 12, P=10, cache_dir=None, precision="double"):
+    """
+    Total multitaper PSDs of all velocity time series of a Mooring at once.
+
+    Trailing NaNs are cut from every column. Columns of equal valid length are grouped,
+    so that each group needs only one taper set and one FFT call.
+
+    In:
+      mooring                Mooring dataframe with complex velocities, a "time" column is ignored
+      dt, P, cache_dir       see total_multitaper
+      precision = "double"   see total_multitaper, "single" also copies each group of columns as complex64
+
+    Out:
+      dictionary {column name: (freq [cpd], total_psd [m$^2$/s$^2$ days])} in column order
+    """
+    columns = [column for column in mooring.columns if column != "time"]
+
+    groups = {}
+    for column in columns:
+        N = helper.Data.valid_length(mooring[column].to_numpy())
+        groups.setdefault(N, []).append(column)
+
+    spectra = {}
+    for N, group_columns in groups.items():
+        block = as_precision(mooring[group_columns].to_numpy()[:N].T, precision)
+        f, S, _dof = _multitaper_block(block, dt=dt, P=P, cache_dir=cache_dir, precision=precision)
+        freq, total_psds = _fold_to_total_psd(f, S)
+        for column, total_psd in zip(group_columns, total_psds):
+            spectra[column] = (freq, total_psd)
+
+    return {column: spectra[column] for column in columns}
+
+
+def cross_spectral_matrix(time_series, dt=1 / 12, P=10, cache_dir=None, precision="double"):
+    """
+    Multitaper cross-spectral matrix of several equally long time series.
+
+    All series are tapered and transformed once, the matrix of all pairs is then a single
+    einsum over the eigencoefficients, S_ij(f) = dt / K * sum_k X_ik(f) conj(X_jk(f)).
+    The tapers are weighted equally, so the diagonal is the non-adaptive multitaper estimate.
+
+    In:
+      time_series            array of shape (n_series, N), real or complex
+      dt, P, cache_dir       see total_multitaper
+      precision              see total_multitaper
+
+    Out:
+      freq [cpd]             two-sided and ascending, for u+iv negative frequencies rotate clockwise
+      cross_spectra          complex array of shape (n_series, n_series, n_freq)
+    """
+    _block, eigencoefficients, _eigenvalues = _eigencoefficients(
+        np.atleast_2d(time_series), P, cache_dir=cache_dir, precision=precision
+    )
+    K, nfft = np.shape(eigencoefficients)[-2:]
+    cross_spectra = np.einsum("ikf,jkf->ijf", eigencoefficients, eigencoefficients.conj()) * (dt / K)
+    freq = scipy.fft.fftshift(scipy.fft.fftfreq(nfft, dt))
+    return freq, scipy.fft.fftshift(cross_spectra, axes=-1)
+
+
+def coherence_and_phase(cross_spectra):
+    """
+    squared coherence |S_ij|^2 / (S_ii S_jj) and phase angle(S_ij) [rad] of a cross-spectral matrix
+    """
+    auto_spectra = np.real(np.einsum("iif->if", cross_spectra))
+    coherence = np.abs(cross_spectra) ** 2 / (auto_spectra[:, None, :] * auto_spectra[None, :, :])
+    return coherence, np.angle(cross_spectra)
+
+
+def mooring_cross_spectra(mooring, dt=1 / 12, P=10, cache_dir=None, precision="double"):
+    """
+    Cross-spectral matrix, squared coherence and phase between all instruments of a Mooring.
+
+    All columns are cut to the shortest valid length, i.e. to the common time span
+    without the trailing NaN padding.
+
+    In:
+      mooring                Mooring dataframe with complex velocities, a "time" column is ignored
+      dt, P, cache_dir       see total_multitaper
+      precision              see total_multitaper
+
+    Out:
+      columns                instrument names in the order of the matrix axes
+      freq [cpd]             see cross_spectral_matrix
+      cross_spectra          of shape (n_instruments, n_instruments, n_freq)
+      coherence, phase       see coherence_and_phase
+    """
+    columns = [column for column in mooring.columns if column != "time"]
+    N = min(helper.Data.valid_length(mooring[column].to_numpy()) for column in columns)
+    block = as_precision(mooring[columns].to_numpy()[:N].T, precision)
+    freq, cross_spectra = cross_spectral_matrix(block, dt=dt, P=P, cache_dir=cache_dir, precision=precision)
+    coherence, phase = coherence_and_phase(cross_spectra)
+    return columns, freq, cross_spectra, coherence, phase
+
+
+def _symmetric_interval_half_width(K, gamma, scale):
+    """
+    Half width of the interval with probability gamma, centred on 1 (scale = "lin") for the ratio
+    S/S0 or centred on the mean of log10(S/S0) (scale = "log"), where 2K S/S0 is chi-square
+    distributed with 2K degrees of freedom. K may be an array and non-integer.
+    """
+    if not 0 < gamma < 1:
+        raise ValueError(f"The confidence level gamma = {gamma} has to be between 0 and 1")
+    K = np.asarray(K, dtype=float)
+    if scale == "lin":
+        # cdf of the ratio r = S/S0
+        def probability(d):
+            return scipy.special.gammainc(K, K * (1 + d)) - scipy.special.gammainc(K, K * np.maximum(1 - d, 0))
+    elif scale == "log":
+        # mean of log10(S/S0), see pav15-arxiv
+        log_mean = (np.log(2) + np.log(1 / 2 / K) + scipy.special.digamma(K)) / np.log(10)
+        def probability(t):
+            return (
+                scipy.special.gammainc(K, K * 10 ** (log_mean + t))
+                - scipy.special.gammainc(K, K * 10 ** (log_mean - t))
+            )
+    else:
+        raise NotImplementedError(f"scale = {scale} is not implemented")
+
+    # the probability grows monotonically with the half width, which allows a vectorized bisection
+    lower = np.zeros_like(K)
+    upper = np.ones_like(K)
+    while np.any(probability(upper) < gamma):
+        upper = np.where(probability(upper) < gamma, 2 * upper, upper)
+    for _ in range(CONFIDENCE_BISECTION_STEPS):
+        middle = (lower + upper) / 2
+        too_small = probability(middle) < gamma
+        lower = np.where(too_small, middle, lower)
+        upper = np.where(too_small, upper, middle)
+    half_width = (lower + upper) / 2
+
+    if scale == "lin":
+        return 1 - half_width, 1 + half_width
+    return log_mean - half_width, log_mean + half_width
+
+
+_confidence_intervals = {}
+
+
+def confidence_interval_factors(K=None, gamma=0.95, scale="lin", dof=None):
+    """
+    Symmetric confidence intervals for multitaper spectral estimates.
+
+    Replaces the dense pdf grids of _multitaper.mconf by the chi-square cdf,
+    with the same definition of the interval (see mconf):
+
+        Probability that ra < S/S0 < rb = gamma                 (linear case)
+        Probability that ra < log10(S)-log10(S0) < rb = gamma   (log10 case)
+
+    The confidence interval is S*ra to S*rb for the spectral values in linear space,
+    or S*10^ra to S*10^rb in log10 space.
+
+    In:
+      K = None               number of tapers, scalar or array, normally 2*P-1
+      gamma = 0.95           confidence level
+      scale = "lin"          "lin" or "log"
+      dof = None             degrees of freedom instead of K, e.g. per frequency from adaptive_multitaper
+
+    Out:
+      ra, rb                 factors with the shape of K or dof
+    """
+    if (K is None) == (dof is None):
+        raise ValueError("Specify either the number of tapers K or the degrees of freedom dof")
+    if dof is not None:
+        K = np.asarray(dof, dtype=float) / 2
+
+    # numbers of tapers and degrees of freedom often repeat, within one call and between calls,
+    # so the intervals are only solved for the unique values, which are not yet memorized
+    unique_K, inverse = np.unique(np.asarray(K, dtype=float), return_inverse=True)
+    keys = [(K_value, float(gamma), scale) for K_value in unique_K.tolist()]
+    factors = {key: _confidence_intervals[key] for key in keys if key in _confidence_intervals}
+    missing_keys = [key for key in keys if key not in factors]
+    if missing_keys:
+        missing_K = np.array([key[0] for key in missing_keys])
+        missing_ra, missing_rb = _symmetric_interval_half_width(missing_K, gamma, scale)
+        for key, ra, rb in zip(missing_keys, missing_ra.tolist(), missing_rb.tolist()):
+            factors[key] = (ra, rb)
+            if not np.isfinite(key[0]):
+                continue
+            if len(_confidence_intervals) >= CONFIDENCE_CACHE_SIZE:
+                _confidence_intervals.pop(next(iter(_confidence_intervals)))
+            _confidence_intervals[key] = (ra, rb)
+
+    ra, rb = (np.array([factors[key][i] for key in keys]) for i in range(2))
+    if np.ndim(K) == 0:
+        return float(ra[0]), float(rb[0])
+    return ra[inverse].reshape(np.shape(K)), rb[inverse].reshape(np.shape(K))
+
+
+_tidal_peak_intervals = {}
+
+
+def tidal_peak_intervals(freq, P, tidal_periods):
+    """
+    Index intervals [start, end] of width 2P+1 around tidal frequencies, merged where they overlap or touch.
+
+    The intervals are sorted once and merged in a single sweep. The result is memorized per
+    (frequency grid, P, set of tidal periods), so instruments with the same frequency grid, e.g. all
+    instruments with an equally long time series, compute the intervals only once.
+
+    In:
+      freq [cpd]             frequency grid of the spectrum
+      P                      time_bandwidth_product, half width of the intervals in frequency bins
+      tidal_periods [hours]  iterable of tidal periods, in any order
+
+    Out:
+      read-only integer array of shape (n_intervals, 2) with ascending start and end indices
+    """
+    freq = np.ascontiguousarray(freq)
+    tidal_periods = tuple(sorted(float(period) for period in tidal_periods))
+    key = hashlib.sha1(freq.view(np.uint8)).hexdigest(), freq.dtype.str, len(freq), P, tidal_periods
+    if key in _tidal_peak_intervals:
+        return _tidal_peak_intervals[key]
+
+    tidal_freqs_in_cpd = 24 / np.asarray(tidal_periods)
+    tidal_indices = np.sort(np.argmin(np.abs(freq[None, :] - tidal_freqs_in_cpd[:, None]), axis=-1))
+
+    merged = []
+    for start, end in zip(tidal_indices - P, tidal_indices + P + 1):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    intervals = np.array(merged, dtype=int).reshape(-1, 2)
+    intervals.setflags(write=False)
+
+    if len(_tidal_peak_intervals) >= TIDAL_PEAK_CACHE_SIZE:
+        _tidal_peak_intervals.pop(next(iter(_tidal_peak_intervals)))
+    _tidal_peak_intervals[key] = intervals
+    return intervals
+
+
 def integrate_psd_interval(freq,psd,a = None, b = None):
     """
     Integration between a und b using the trapezoidal integration method
@@ -34,7 +696,76 @@ def integrate_psd_interval(freq,psd,a = None, b = None):
     
     lower = np.argmin(np.abs(freq-a)).astype(int)
     upper = np.argmin(np.abs(freq-b)).astype(int)
-    return np.trapz(y = psd[lower:upper], x = freq[lower:upper])
+    return np.trapezoid(y = psd[lower:upper], x = freq[lower:upper])
+
+
+class PowerSpectrum:
+    """
+    PSD with a precomputed cumulative trapezoidal integral.
+
+    Band energies are answered with a binary search for the band edges and two lookups
+    in the cumulative integral, instead of a full scan and a new integration per band.
+    Band edges can be scalars or arrays, so that many bands are integrated in one call.
+    psd may also hold several spectra on the same frequency axis, shape (..., len(freq)).
+
+    edges = "nearest" reproduces integrate_psd_interval exactly: both edges are moved to the
+    nearest frequency and the integration stops one frequency before the upper edge.
+    edges = "exact" integrates from a to b, interpolating the psd linearly at the edges.
+    """
+
+    def __init__(self, freq, psd):
+        freq = np.asarray(freq)
+        psd = np.asarray(psd)
+        order = np.argsort(freq, kind="stable")
+        self.freq = freq[order]
+        self.psd = psd[..., order]
+        self.cumulative = scipy.integrate.cumulative_trapezoid(self.psd, self.freq, axis=-1, initial=0)
+
+    def __len__(self):
+        return len(self.freq)
+
+    def nearest_index(self, x):
+        """index of the frequency closest to x, the lower one in case of a tie, like np.argmin(np.abs(freq - x))"""
+        x = np.asarray(x, dtype=float)
+        upper = np.clip(np.searchsorted(self.freq, x), 1, len(self.freq) - 1)
+        lower = upper - 1
+        take_lower = np.abs(self.freq[lower] - x) <= np.abs(self.freq[upper] - x)
+        return np.where(take_lower, lower, upper)
+
+    def _cumulative_at(self, x):
+        """cumulative integral up to an arbitrary frequency x inside the frequency range"""
+        x = np.clip(np.asarray(x, dtype=float), self.freq[0], self.freq[-1])
+        i = np.clip(np.searchsorted(self.freq, x, side="right") - 1, 0, len(self.freq) - 2)
+        width = self.freq[i + 1] - self.freq[i]
+        fraction = (x - self.freq[i]) / width
+        psd_at_x = self.psd[..., i] + fraction * (self.psd[..., i + 1] - self.psd[..., i])
+        return self.cumulative[..., i] + (x - self.freq[i]) * (self.psd[..., i] + psd_at_x) / 2
+
+    def integrate(self, a=None, b=None, edges="nearest"):
+        """
+        Energy between the frequencies a and b
+
+        In:
+          a, b = None            band edges, scalars or arrays, default are the lowest and highest frequency
+          edges = "nearest"      "nearest" for parity with integrate_psd_interval, or "exact"
+
+        Out:
+          band energy with the broadcast shape of a and b (and the leading shape of psd)
+        """
+        if a is None: a = self.freq[0]
+        if b is None: b = self.freq[-1]
+
+        if edges == "nearest":
+            lower = self.nearest_index(a)
+            # the slice psd[lower:upper] of integrate_psd_interval ends at upper - 1
+            last = self.nearest_index(b) - 1
+            band_energy = self.cumulative[..., last] - self.cumulative[..., lower]
+            return np.where(last > lower, band_energy, 0.0)
+
+        if edges == "exact":
+            return self._cumulative_at(b) - self._cumulative_at(a)
+
+        raise NotImplementedError(f"edges = {edges} is not implemented")
 
 
 # def _total_multitaper(complex_velocity,dt = 1/12,P=10):
@@ -64,38 +795,3 @@ def integrate_psd_interval(freq,psd,a = None, b = None):
 #     except ValueError:
 #         total_psd = S[np.where(f<0)][::-1][:-1] + S[np.where(f>0)]
 #     return freq, total_psd
-"""
-@static_method
-def rotary_multitaper(cvs, dt = 1/12, labels = None, ax = None, **Kwargs):    
-    #TODO TODO 
-    if ax == None:
-        fig,ax = plt.subplots(1)
-        ax.set_xlabel('Frequency (cycles/day)')
-        ax.set_ylabel('PSD (cm$^2$/s$^2$ days)')
-
-    if not isinstance(cvs, list):
-        cvs = [cvs]
-
-    for i,cv in enumerate(cvs):
-
-        cv = cv[~np.isnan(cv)] #remove 
-
-        f, _S = sg.periodogram(cv-np.mean(cv), fs=1/dt) #fs = sampling frequency (cyclic)
-
-        P = 10
-        psi, eigs = spectrum.mtm.dpss(np.size(cv), NW=P, k=2*P-1)
-
-        Zk, weights, eigenvalues = spectrum.mtm.pmtm(cv-np.mean(cv), k=2*P-1,  NFFT=np.size(cv), v=psi, e=eigs, method="unity");
-        S=np.mean(np.transpose(np.abs(Zk)**2), axis=1) * dt
-
-
-        if labels is not None:
-            if type(labels[i]) not in [str,int]: label = f"{labels[i]:.0f}"
-            else: label = str(labels[i])
-            ax.loglog(f[np.where(f>0)],S[np.where(f>0)], label = label, **Kwargs)
-        else:
-            ax.loglog(f[np.where(f>0)],S[np.where(f>0)], **Kwargs)
-
-
-    return f[np.where(f>0)],S[np.where(f>0)]
-"""
\ No newline at end of file
@@ -0,0 +1,122 @@
+import hashlib
+import pathlib
+
+import numpy as np
+
+import src.helper as helper
+import src.spectra as spectra
+
+
+class SpectrumCache:
+    """
+    Total multitaper spectra, computed once per instrument and pipeline run.
+
+    Spectra are keyed by (mooring location, instrument depth, dt, P, hash of the data),
+    so a changed time series or changed spectral settings never return a stale result.
+    The cache is held in memory and, if cache_dir is given, also stored as .npz files,
+    so that e.g. the figure scripts can reuse the spectra of the IDEMIX scripts.
+    The precision mode of src.spectra ("double" or "single") is part of the key.
+    """
+
+    def __init__(self, cache_dir=None, precision="double"):
+        self.cache_dir = None if cache_dir is None else pathlib.Path(cache_dir)
+        self.precision = precision
+        self._memory = {}
+
+    def __len__(self):
+        return len(self._memory)
+
+    def merge(self, other):
+        """
+        Add the in-memory spectra of another cache, e.g. of a copy that was used in a worker process.
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge a {other.precision} precision cache into a {self.precision} precision cache")
+        self._memory.update(other._memory)
+
+    @staticmethod
+    def key(location, depth, dt, P, data, precision="double"):
+        data = np.ascontiguousarray(data)
+        data_hash = hashlib.sha1(data.view(np.uint8)).hexdigest()
+        key = f"{location}", f"{depth}", float(dt), float(P), data_hash
+        # keeps the keys of double precision spectra from before the precision mode was introduced
+        return key if precision == "double" else key + (precision,)
+
+    def _file(self, key):
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return self.cache_dir / f"spectrum_{name}.npz"
+
+    def _load(self, key):
+        if key in self._memory:
+            return self._memory[key]
+        if self.cache_dir is not None and self._file(key).exists():
+            with np.load(self._file(key)) as data:
+                self._memory[key] = (data["freq"], data["total_psd"])
+            return self._memory[key]
+        return None
+
+    def _store(self, key, freq, total_psd):
+        self._memory[key] = (freq, total_psd)
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            np.savez(self._file(key), freq=freq, total_psd=total_psd)
+
+    def total_multitaper(self, complex_velocity, location, depth, dt=1 / 12, P=10):
+        """
+        Cached version of src.spectra.total_multitaper.
+        location and depth only identify the instrument, any printable value is valid.
+        """
+        complex_velocity = np.asarray(complex_velocity)
+        key = self.key(location, depth, dt, P, complex_velocity, self.precision)
+        cached = self._load(key)
+        if cached is None:
+            freq, total_psd = spectra.total_multitaper(complex_velocity, dt=dt, P=P, precision=self.precision)
+            self._store(key, freq, total_psd)
+            cached = (freq, total_psd)
+        return cached
+
+    def _mooring_keys(self, mooring, dt, P):
+        keys = {}
+        for column in mooring.columns:
+            if column == "time":
+                continue
+            series = mooring[column].to_numpy()
+            series = series[:helper.Data.valid_length(series)]
+            keys[column] = self.key(mooring.location, column, dt, P, series, self.precision)
+        return keys
+
+    def mooring_subset(self, mooring, dt=1 / 12, P=10):
+        """
+        New cache with only the in-memory spectra of the instruments of one mooring and the same cache_dir,
+        e.g. to send a worker process only the spectra it needs, see merge.
+        """
+        subset = SpectrumCache(cache_dir=self.cache_dir, precision=self.precision)
+        for key in self._mooring_keys(mooring, dt, P).values():
+            if key in self._memory:
+                subset._memory[key] = self._memory[key]
+        return subset
+
+    def mooring_total_multitaper(self, mooring, dt=1 / 12, P=10):
+        """
+        Cached version of src.spectra.mooring_total_multitaper.
+        Only the instruments without a cached spectrum are computed, in one batched call.
+        """
+        keys = self._mooring_keys(mooring, dt, P)
+        columns = list(keys)
+
+        missing_columns = []
+        results = {}
+        for column in columns:
+            cached = self._load(keys[column])
+            if cached is None:
+                missing_columns.append(column)
+            else:
+                results[column] = cached
+
+        if missing_columns:
+            computed = spectra.mooring_total_multitaper(mooring[missing_columns], dt=dt, P=P, precision=self.precision)
+            for column, (freq, total_psd) in computed.items():
+                self._store(keys[column], freq, total_psd)
+                results[column] = (freq, total_psd)
+
+        return {column: results[column] for column in columns}
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+
+def location_key(lat, lon):
+    """
+    column name of a mooring location in N_values.pkl and N_std.pkl
+    """
+    return f"({lat:.2f},{lon:.2f})"
+
+
+class StratificationIndex:
+    """
+    Buoyancy frequency N and its error per (mooring location, meters above bottom).
+
+    The tables N_values.pkl and N_std.pkl have a "mab" column and one column of N in rad/s
+    per mooring location, named by location_key. Their values are stored as one row per location,
+    so that a lookup is a direct integer offset, location row * number of mab values + (mab - first mab),
+    instead of a boolean scan of the "mab" column.
+    """
+
+    def __init__(self, N_table, N_error_table=None):
+        mab = N_table["mab"].to_numpy()
+        self.first_mab = int(mab[0])
+        if not np.array_equal(mab, np.arange(self.first_mab, self.first_mab + len(mab))):
+            raise ValueError("The mab column has to be ascending integers without gaps")
+        self.n_mab = len(mab)
+
+        self.locations = [column for column in N_table.columns if column != "mab"]
+        self._location_rows = {location: row for row, location in enumerate(self.locations)}
+        self._N = np.ascontiguousarray(N_table[self.locations].to_numpy(dtype=float).T)
+
+        if N_error_table is None:
+            self._N_error = None
+        else:
+            if not np.array_equal(N_error_table["mab"].to_numpy(), mab):
+                raise ValueError("N_table and N_error_table have different mab values")
+            self._N_error = np.ascontiguousarray(N_error_table[self.locations].to_numpy(dtype=float).T)
+
+    @property
+    def has_errors(self):
+        return self._N_error is not None
+
+    @classmethod
+    def from_pickles(cls, N_path, N_error_path=None):
+        N_table = pd.read_pickle(N_path)
+        N_error_table = None if N_error_path is None else pd.read_pickle(N_error_path)
+        return cls(N_table, N_error_table)
+
+    def _offsets(self, lat, lon, mab, missing):
+        lat, lon, mab = np.broadcast_arrays(np.asarray(lat), np.asarray(lon), np.asarray(mab))
+        # the location keys are formatted only once per distinct location
+        unique_locations, location_indices = np.unique(np.stack([lat.ravel(), lon.ravel()]), axis=1, return_inverse=True)
+        keys = [location_key(lat_value, lon_value) for lat_value, lon_value in unique_locations.T]
+        rows = np.array([self._location_rows.get(key, -1) for key in keys])[location_indices].reshape(lat.shape)
+        mab_offsets = np.round(mab).astype(int) - self.first_mab
+
+        is_valid = (rows >= 0) & (mab_offsets >= 0) & (mab_offsets < self.n_mab)
+        if missing == "raise" and not np.all(is_valid):
+            raise KeyError(f"No N value for {np.count_nonzero(~is_valid)} of the (location, mab) pairs")
+        if missing not in ("raise", "nan"):
+            raise ValueError(f"missing = {missing!r} has to be 'raise' or 'nan'")
+        return np.where(is_valid, rows * self.n_mab + mab_offsets, 0), is_valid
+
+    def lookup(self, lat, lon, mab, missing="raise"):
+        """
+        N in rad/s for arrays of latitudes, longitudes and mab values, which are broadcast against each other.
+
+        missing = "raise" raises a KeyError for unknown locations or mab values, "nan" returns NaN for them.
+        """
+        offsets, is_valid = self._offsets(lat, lon, mab, missing)
+        return np.where(is_valid, self._N.ravel()[offsets], np.nan)
+
+    def lookup_error(self, lat, lon, mab, missing="raise"):
+        """
+        standard deviation of N in rad/s, see lookup
+        """
+        if self._N_error is None:
+            raise ValueError("The index was built without an N_error_table")
+        offsets, is_valid = self._offsets(lat, lon, mab, missing)
+        return np.where(is_valid, self._N_error.ravel()[offsets], np.nan)
@@ -1,8 +1,96 @@
 # conftest.py
 # Try to set the output of pytest to use scientific notation
+import pathlib
+import sys
+
+import numpy as np
 import pandas as pd
 import pytest
 
+from src.barotropic_tide import CATSBarotropicTide
+from src.location import Location
+from src.mooring import Mooring
+from src.stratification import StratificationIndex, location_key
+
+# the IDEMIX scripts import their sibling modules, e.g. "import equations as eq"
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / "scripts" / "IDEMIX_parameterization"))
+
+from calculate_available_energy_levels import EnergyLevelInputs
+
 @pytest.hookimpl(tryfirst=True)
 def pytest_configure(config):
     pd.set_option('display.float_format', '{:.3e}'.format)
+
+
+LOCATION = Location(lat=-63.51, lon=-51.64)
+SEA_FLOOR_DEPTH = 1656.0
+SECOND_LOCATION = Location(lat=-63.66, lon=-50.81)
+SECOND_SEA_FLOOR_DEPTH = 2493.0
+
+
+def _velocity(n, tidal_amplitude, seed):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / 12
+    velocity = tidal_amplitude * np.exp(2j * np.pi * 24 / 12.42 * t)
+    # red noise continuum
+    noise = rng.standard_normal(n) + 1j * rng.standard_normal(n)
+    red = np.zeros(n, dtype=complex)
+    for i in range(1, n):
+        red[i] = 0.97 * red[i - 1] + noise[i]
+    return velocity + 0.003 * red
+
+
+def _mooring(location, depths, n=3000, seed=0):
+    mooring = Mooring()
+    mooring["time"] = pd.date_range("2019-01-01", periods=n, freq="2h")
+    for k, depth in enumerate(depths):
+        mooring[depth] = _velocity(n, 0.02 + 0.01 * k, seed=seed + k)
+    # shorter time series, padded with NaNs
+    mooring.loc[n - 200:, depths[1]] = np.nan
+    mooring.location = location
+    mooring.time_delta = pd.Timedelta("2h")
+    return mooring
+
+
+def _stratification_tables(locations):
+    mab = np.arange(0, 3000)
+    N_table = pd.DataFrame({"mab": mab})
+    N_error_table = pd.DataFrame({"mab": mab})
+    for location in locations:
+        column = location_key(location.lat, location.lon)
+        N_table[column] = 1.2e-3 * np.exp(-mab / 3000) + 5e-4
+        N_error_table[column] = np.full(len(mab), 2e-4)
+    return N_table, N_error_table
+
+
+@pytest.fixture
+def mooring():
+    return _mooring(LOCATION, ["1400", "1513", "1656"])
+
+
+@pytest.fixture
+def stratification():
+    return StratificationIndex(*_stratification_tables([LOCATION]))
+
+
+@pytest.fixture
+def inputs():
+    moorings = [
+        _mooring(LOCATION, ["1400", "1513", "1656"], seed=0),
+        _mooring(SECOND_LOCATION, ["2100", "2300", "2493"], n=3400, seed=10),
+    ]
+    rng = np.random.default_rng(3)
+    n = 24 * 150
+    t = np.arange(n) / 24
+    cats_df = pd.DataFrame({"time": pd.date_range("2019-01-01", periods=n, freq="1h")})
+    for k, location in enumerate([LOCATION, SECOND_LOCATION]):
+        cats_df[(location.lat, location.lon)] = (
+            0.005 * (k + 1) * np.exp(2j * np.pi * 24 / 12.42 * t)
+            + 0.0005 * (rng.standard_normal(n) + 1j * rng.standard_normal(n))
+        )
+    return EnergyLevelInputs(
+        moorings=moorings,
+        stratification=StratificationIndex(*_stratification_tables([LOCATION, SECOND_LOCATION])),
+        max_depth_dict={LOCATION.lon: SEA_FLOOR_DEPTH, SECOND_LOCATION.lon: SECOND_SEA_FLOOR_DEPTH},
+        barotropic_tide=CATSBarotropicTide(cats_df),
+    )
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.spectra as spectra
+from src.barotropic_tide import CATSBarotropicTide
+
+
+@pytest.fixture
+def cats_df():
+    rng = np.random.default_rng(3)
+    n = 24 * 120
+    t = np.arange(n) / 24
+    cats_df = pd.DataFrame({"time": pd.date_range("2019-01-01", periods=n, freq="1h")})
+    # columns in a different order than the lookups below
+    for k, (lat, lon) in enumerate([(-63.7, -50.1), (-63.4, -52.28), (-63.6, -51.0)]):
+        cats_df[(lat, lon)] = (
+            0.01 * (k + 1) * np.exp(2j * np.pi * 24 / 12.42 * t)
+            + 0.0005 * (rng.standard_normal(n) + 1j * rng.standard_normal(n))
+        )
+    return cats_df
+
+
+def test_band_energies_match_single_spectra(cats_df):
+    tide = CATSBarotropicTide(cats_df)
+    energies = tide.band_energies(1.5, 2.5, P=10)
+
+    model_columns = [column for column in cats_df.columns if column != "time"]
+    for energy, column in zip(energies, model_columns):
+        freq, total_psd = spectra.total_multitaper(cats_df[column].to_numpy(), dt=1 / 24, P=10)
+        expected = spectra.PowerSpectrum(freq, total_psd / 2).integrate(a=1.5, b=2.5)
+        assert np.isclose(energy, expected, rtol=1e-12)
+    # most of the variance of a tidal velocity of amplitude A is A^2/2 in the semidiurnal band
+    assert np.allclose(energies, 0.5 * (0.01 * np.arange(1, 4)) ** 2, rtol=0.05)
+    # cached per band and P
+    assert tide.band_energies(1.5, 2.5, P=10) is energies
+    assert tide.band_energies(1.5, 2.5, P=5) is not energies
+
+
+def test_nearest_point(cats_df):
+    tide = CATSBarotropicTide(cats_df)
+    assert tide.nearest_point(-63.41, -52.27) == 1
+    assert tide.nearest_point(-63.69, -50.09) == 0
+    assert tide.band_energy(-63.61, -51.01, 1.5, 2.5) == tide.band_energies(1.5, 2.5)[2]
+    with pytest.raises(KeyError):
+        tide.nearest_point(-60, -50, max_distance=10)
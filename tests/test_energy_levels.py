@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.spectra as spectra
+from src.spectrum_cache import SpectrumCache
+
+import energy_levels
+from calculate_available_energy_levels import EnergyLevelInputs, compute_available_energy, config_grid, load_inputs, sweep
+from energy_levels import EnergyLevelConfig
+from conftest import LOCATION, SEA_FLOOR_DEPTH, SECOND_LOCATION, _stratification_tables
+
+
+def test_single_precision_energy_levels(mooring, stratification):
+    records = {}
+    for precision in ("double", "single"):
+        records[precision] = energy_levels.mooring_energy_levels(
+            mooring.with_precision(precision),
+            cats_barotropic_energy=1e-4,
+            stratification=stratification,
+            max_depth_dict={LOCATION.lon: SEA_FLOOR_DEPTH},
+            spectrum_cache=SpectrumCache(precision=precision),
+            verbose=False,
+        )
+    assert records["single"].dtype == energy_levels.ENERGY_LEVEL_DTYPE
+    assert np.array_equal(records["single"]["mab"], records["double"]["mab"])
+    assert np.all(records["double"]["available_E"] > 0)
+    assert np.allclose(records["single"]["available_E"], records["double"]["available_E"], rtol=1e-6, atol=0)
+    assert np.allclose(records["single"]["E_Error"], records["double"]["E_Error"], rtol=1e-5, atol=0)
+
+
+def test_parallel_energy_levels(inputs, capsys):
+    sequential = compute_available_energy(inputs=inputs)
+    sequential_messages = capsys.readouterr().out
+
+    spectrum_cache = SpectrumCache()
+    parallel = compute_available_energy(inputs=inputs, spectrum_cache=spectrum_cache, n_workers=2)
+    assert np.array_equal(parallel, sequential)
+    # the progress messages of the workers are printed in mooring order
+    assert capsys.readouterr().out == sequential_messages
+    assert "barotropic energy is taken" in sequential_messages
+    # the spectra computed by the workers are merged into the cache
+    assert len(spectrum_cache) == 6
+    subset = spectrum_cache.mooring_subset(inputs.moorings[1], P=10)
+    assert len(subset) == 3
+    assert all(key[0] == f"{SECOND_LOCATION}" for key in subset._memory)
+
+
+def test_tidal_periods():
+    assert EnergyLevelConfig(tidal_constituents=("S2", "M2")).tidal_periods() == sorted(
+        EnergyLevelConfig(tidal_constituents=("M2", "S2")).tidal_periods(), reverse=True
+    )
+    with pytest.raises(ValueError, match="X2"):
+        EnergyLevelConfig(tidal_constituents=("M2", "X2")).tidal_periods()
+
+
+def test_config_grid():
+    configs = config_grid(time_bandwidth_product=[5, 10], extension_start_freq=[2.8, 3.2, 3.6])
+    assert len(configs) == len(set(configs)) == 6
+    assert {(config.time_bandwidth_product, config.extension_start_freq) for config in configs} == {
+        (P, freq) for P in (5, 10) for freq in (2.8, 3.2, 3.6)
+    }
+    # all other settings keep their defaults
+    assert all(config.fit_method == EnergyLevelConfig().fit_method for config in configs)
+
+
+def test_sweep_computes_spectra_once_per_time_bandwidth_product(inputs, monkeypatch):
+    calls = []
+    mooring_total_multitaper = spectra.mooring_total_multitaper
+
+    def counting_mooring_total_multitaper(mooring, *args, P=10, **kwargs):
+        calls.append(P)
+        return mooring_total_multitaper(mooring, *args, P=P, **kwargs)
+
+    monkeypatch.setattr(spectra, "mooring_total_multitaper", counting_mooring_total_multitaper)
+    configs = config_grid(time_bandwidth_product=[5, 10], high_mode_fraction=[0.2, 0.3, 0.4])
+    results = sweep(configs, inputs=inputs)
+
+    assert list(results) == configs
+    # one call per mooring and one for all CATS model points per time-bandwidth product
+    assert sorted(calls) == [5] * 3 + [10] * 3
+    for config, records in results.items():
+        reference = compute_available_energy(config, inputs)
+        assert np.array_equal(records, reference)
+
+
+def test_load_inputs_without_N_errors(inputs, tmp_path):
+    (tmp_path / "data" / "mooring").mkdir(parents=True)
+    (tmp_path / "data" / "CATS").mkdir()
+    (tmp_path / "method_results").mkdir()
+    # load_inputs drops the instrument at 750 m of the third mooring
+    third_mooring = inputs.moorings[0].copy()
+    third_mooring["750"] = third_mooring["1400"]
+    moorings = [*inputs.moorings, third_mooring]
+    pd.to_pickle(moorings, tmp_path / "data" / "mooring" / "list_of_moorings.pkl")
+    np.savez(tmp_path / "data" / "max_depth_dict.npz", max_depth_dict=inputs.max_depth_dict)
+    cats_df = pd.DataFrame({"time": pd.date_range("2019-01-01", periods=48, freq="1h")})
+    cats_df[(LOCATION.lat, LOCATION.lon)] = np.zeros(48, dtype=complex)
+    cats_df.to_pickle(tmp_path / "data" / "CATS" / "cats_data.pickle")
+    N_table, N_error_table = _stratification_tables([LOCATION, SECOND_LOCATION])
+    N_table.to_pickle(tmp_path / "method_results" / "N_values.pkl")
+
+    arguments = dict(data_dir=tmp_path / "data", method_results_dir=tmp_path / "method_results")
+    loaded = load_inputs(**arguments)
+    assert not loaded.stratification.has_errors
+    assert "750" not in loaded.moorings[2].columns
+    records = compute_available_energy(inputs=EnergyLevelInputs(
+        loaded.moorings[:2], loaded.stratification, loaded.max_depth_dict, inputs.barotropic_tide
+    ))
+    assert np.all(np.isnan(records["N_error"])) and np.all(records["available_E"] > 0)
+
+    N_error_table.to_pickle(tmp_path / "method_results" / "N_std.pkl")
+    assert load_inputs(**arguments).stratification.has_errors
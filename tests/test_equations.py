@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+import equations as eq
+
+
+def _fields(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    coriolis_frequency = -1.3e-4 * np.ones(shape)
+    buoyancy_frequency = rng.uniform(2e-4, 2e-3, shape)
+    error_buoyancy_frequency = rng.uniform(1e-5, 1e-4, shape)
+    energy_level = rng.uniform(1e-5, 1e-3, shape)
+    error_energy_level = rng.uniform(1e-7, 1e-5, shape)
+    return coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency, energy_level, error_energy_level
+
+
+def _separate_results(coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency, energy_level,
+                      error_energy_level):
+    return (
+        eq.get_dissipation_rate(coriolis_frequency, buoyancy_frequency, energy_level),
+        eq.get_multiplicative_error_of_dissipation_rate(
+            coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency, energy_level, error_energy_level
+        ),
+        eq.get_additive_error_of_dissipation_rate(
+            coriolis_frequency, buoyancy_frequency, error_buoyancy_frequency, energy_level, error_energy_level
+        ),
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [None, 7])
+def test_fused_kernel_matches_separate_functions(chunk_size):
+    fields = _fields((25, 4))
+    expected = _separate_results(*fields)
+
+    results = eq.get_dissipation_rate_and_errors(*fields, chunk_size=chunk_size)
+    for result, reference in zip(results, expected):
+        assert np.allclose(result, reference, rtol=1e-13, atol=0)
+
+    out = tuple(np.full((25, 4), np.nan) for _ in range(3))
+    results = eq.get_dissipation_rate_and_errors(*fields, out=out, chunk_size=chunk_size)
+    assert all(result is array for result, array in zip(results, out))
+    for result, reference in zip(out, expected):
+        assert np.allclose(result, reference, rtol=1e-13, atol=0)
+
+
+def test_fused_kernel_broadcasting_and_scalars():
+    coriolis_frequency, *fields = _fields((6, 3))
+    # one Coriolis frequency per row, broadcast against the other fields
+    results = eq.get_dissipation_rate_and_errors(coriolis_frequency[:, :1], *fields)
+    expected = _separate_results(coriolis_frequency, *fields)
+    for result, reference in zip(results, expected):
+        assert np.allclose(result, reference, rtol=1e-13, atol=0)
+
+    scalars = [field[0, 0] for field in (coriolis_frequency, *fields)]
+    for result, reference in zip(eq.get_dissipation_rate_and_errors(*scalars), _separate_results(*scalars)):
+        assert np.shape(result) == ()
+        assert np.isclose(result, reference, rtol=1e-13, atol=0)
+
+    with pytest.raises(ValueError):
+        eq.get_dissipation_rate_and_errors(*scalars, out=tuple(np.empty(2) for _ in range(3)))
+
+
+def test_blockwise_grid_matches_whole_array(tmp_path):
+    coriolis_frequency, *fields = _fields((11, 5, 3), seed=1)
+    # Coriolis frequency per latitude, broadcast along the other axes
+    coriolis_frequency = coriolis_frequency[:, :1, :1]
+    expected = eq.get_dissipation_rate_and_errors(coriolis_frequency, *fields)
+
+    # 4 rows per block do not divide the 11 rows of the grid
+    results = eq.get_dissipation_rate_and_errors_on_grid(coriolis_frequency, *fields, block_size=4)
+    for result, reference in zip(results, expected):
+        assert np.array_equal(result, reference)
+
+    out = eq.create_result_memmaps(tmp_path, expected[0].shape)
+    eq.get_dissipation_rate_and_errors_on_grid(coriolis_frequency, *fields, out=out, block_size=4)
+    for name, reference in zip(eq.RESULT_NAMES, expected):
+        assert np.array_equal(np.load(tmp_path / f"{name}.npy", mmap_mode="r"), reference)
+
+
+def test_blockwise_grid_of_dask_and_xarray_fields():
+    xr = pytest.importorskip("xarray")
+    da = pytest.importorskip("dask.array")
+    coriolis_frequency, *fields = _fields((11, 5, 3), seed=2)
+    expected = eq.get_dissipation_rate_and_errors(coriolis_frequency, *fields)
+
+    dims = ("lat", "lon", "depth")
+    coords = {"lat": np.linspace(-64, -63, 11)}
+    data_arrays = [xr.DataArray(da.from_array(field, chunks=(3, 5, 3)), dims=dims, coords=coords) for field in fields]
+    results = eq.get_dissipation_rate_and_errors_on_grid(coriolis_frequency[:, :1, :1], *data_arrays, block_size=4)
+    for result, reference in zip(results, expected):
+        assert isinstance(result, xr.DataArray)
+        assert result.dims == dims
+        assert np.array_equal(result["lat"], coords["lat"])
+        assert np.array_equal(result.values, reference)
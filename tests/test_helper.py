@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from src.helper import Data, matlab2datetime, matlab2datetime64
+
+
+def test_matlab2datetime64_matches_scalar_conversion():
+    rng = np.random.default_rng(1)
+    # random datenums of the measurement period and every 10 minutes of one day
+    datenums = np.concatenate([rng.uniform(733000, 738000, 10_000), 737000 + np.arange(0, 1, 1 / 144)])
+    expected = np.array([matlab2datetime(datenum) for datenum in datenums], dtype="datetime64[ns]")
+    assert np.array_equal(matlab2datetime64(datenums), expected)
+
+
+def test_matlab2datetime64_shapes_and_missing_values():
+    assert matlab2datetime64(719529.5) == np.datetime64("1970-01-01T12:00")
+    time = matlab2datetime64([[737000.25, np.nan]])
+    assert time.shape == (1, 2)
+    assert time.dtype == np.dtype("datetime64[ns]")
+    assert np.isnat(time[0, 1])
+
+
+def test_trailing_nan_padding():
+    array = np.array([1.0, 2.0, 3.0, np.nan, np.nan])
+    assert Data.valid_length(array) == 3
+    assert np.array_equal(Data.cut_trailing_nans(array), array[:3])
+    assert Data.valid_length(array[:3]) == 3
+    with pytest.raises(AssertionError):
+        Data.valid_length(np.array([1.0, np.nan, 3.0, np.nan]))
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from src.longitude_bins import BIN_CENTER, BIN_EDGES, bin_by_longitude, binned_std
+
+
+def test_bin_by_longitude(capsys):
+    # two profiles per bin, 0.2 degrees left and 0.1 degrees right of the bin center
+    lons = np.sort(np.concatenate([BIN_CENTER - 0.2, BIN_CENTER + 0.1]))
+    # a profile exactly on the edge between the first two bins and one east of the last edge
+    lons = np.sort(np.append(lons, [BIN_EDGES[1], BIN_EDGES[-1] + 0.1]))
+    df = pd.DataFrame([lons, 2 * lons], columns=lons)
+
+    binned = bin_by_longitude(df)
+    assert capsys.readouterr().out == ""
+    assert list(binned.columns) == [f"{center}" for center in BIN_CENTER]
+    expected = [np.mean([center - 0.2, center + 0.1]) for center in BIN_CENTER]
+    # the profile on the edge belongs to the bin east of it
+    expected[1] = np.mean([BIN_EDGES[1], BIN_CENTER[1] - 0.2, BIN_CENTER[1] + 0.1])
+    # the last bin includes the profiles east of its right edge
+    expected[-1] = np.mean([BIN_CENTER[-1] - 0.2, BIN_CENTER[-1] + 0.1, BIN_EDGES[-1] + 0.1])
+    assert np.allclose(binned.loc[0], expected)
+    assert np.allclose(binned.loc[1], 2 * np.array(expected))
+
+    binned_std = bin_by_longitude(df, statistic="std")
+    assert np.isclose(binned_std.iloc[0, 0], np.std([BIN_CENTER[0] - 0.2, BIN_CENTER[0] + 0.1], ddof=1))
+
+
+def test_binned_std_of_single_profile_bins():
+    # three profiles in the first bin, two in the second and one in all others
+    lons = np.sort(np.concatenate([BIN_CENTER - 0.2, [BIN_CENTER[0], BIN_CENTER[0] + 0.1, BIN_CENTER[1]]]))
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((3, len(lons))), columns=lons)
+    # in the last row, the first bin has no values and the second only one
+    df.iloc[2, :4] = np.nan
+
+    std = binned_std(df)
+    assert np.allclose(std.iloc[:2, :2], bin_by_longitude(df, statistic="std").iloc[:2, :2])
+    first_bin, second_bin = df.iloc[:, :3].to_numpy(), df.iloc[:, 3:5].to_numpy()
+    pooled = np.sqrt((2 * np.var(first_bin, ddof=1, axis=1) + np.var(second_bin, ddof=1, axis=1)) / 3)
+    assert np.allclose(std.iloc[:2, 2:], pooled[:2, None])
+    # without any bin of two profiles, the pooled standard deviation of the whole dataframe is used
+    total_pooled = np.sqrt(np.sum(pooled[:2] ** 2 * 3) / 6)
+    assert np.allclose(std.iloc[2, 1:], total_pooled)
+    # only bins without values stay NaN
+    assert np.array_equal(std.isna(), bin_by_longitude(df).isna())
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import energy_levels
+import monte_carlo
+from conftest import LOCATION, SEA_FLOOR_DEPTH
+
+
+@pytest.fixture
+def records(mooring, stratification):
+    return energy_levels.mooring_energy_levels(
+        mooring,
+        cats_barotropic_energy=1e-4,
+        stratification=stratification,
+        max_depth_dict={LOCATION.lon: SEA_FLOOR_DEPTH},
+        verbose=False,
+    )
+
+
+def test_zero_spreads_give_nominal_energy(records):
+    records = records.copy()
+    for name in ("N_error", "slope_error", "prefactor_error"):
+        records[name] = 0
+    samples = monte_carlo.sample_energy_budget(
+        records, n_samples=10, high_mode_fraction_range=(0.3, 0.3), relative_f_band_edge_error=0, seed=0
+    )
+    expected = np.broadcast_to(records["available_E"][:, None], samples["available_E"].shape)
+    assert np.allclose(samples["available_E"], expected, rtol=1e-12, atol=0)
+
+
+def test_spread_follows_N_error(records):
+    records = records.copy()
+    records["slope_error"] = 0
+    records["prefactor_error"] = 0
+    spreads = {}
+    for N_error in (0, 1e-5, 2e-5):
+        records["N_error"] = N_error
+        samples = monte_carlo.sample_energy_budget(
+            records, n_samples=2000, high_mode_fraction_range=(0.3, 0.3), relative_f_band_edge_error=0, seed=0
+        )
+        spreads[N_error] = {name: np.std(values, axis=-1) / np.mean(values, axis=-1) for name, values in samples.items()}
+    assert np.all(spreads[0]["eps_IGW"] < 1e-12)
+    # small errors of N propagate linearly
+    for name in ("available_E", "eps_IGW"):
+        assert np.all(spreads[1e-5][name] > 0)
+        assert np.allclose(spreads[2e-5][name], 2 * spreads[1e-5][name], rtol=0.05)
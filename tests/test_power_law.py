@@ -0,0 +1,57 @@
+import numpy as np
+
+import src.power_law as power_law
+
+
+def synthetic_spectra(n_spectra, slope=-2.3, prefactor=1e-3, dof=38, seed=0):
+    rng = np.random.default_rng(seed)
+    freq = np.linspace(3.2, 10, 300)
+    noise = rng.chisquare(dof, size=(n_spectra, len(freq))) / dof
+    return freq, prefactor * freq ** slope * noise
+
+
+def test_log_linear_fit_recovers_power_law_with_calibrated_errors():
+    freq, psd = synthetic_spectra(500)
+    slope, slope_error, prefactor, prefactor_error = power_law.fit_power_law(freq, psd, dof=38)
+    assert slope.shape == (500,)
+    assert np.isclose(np.mean(slope), -2.3, atol=5e-3)
+    assert np.isclose(np.mean(prefactor), 1e-3, rtol=1e-2)
+    # the analytic errors match the spread of the fits
+    assert np.isclose(np.mean(slope_error), np.std(slope), rtol=0.1)
+    assert np.isclose(np.mean(prefactor_error), np.std(prefactor), rtol=0.15)
+
+    fixed_prefactor, _error = power_law.fit_power_law_prefactor(freq, psd, slope=-2.3, dof=38)
+    assert np.isclose(np.mean(fixed_prefactor), 1e-3, rtol=1e-2)
+
+
+def test_stacked_bands_match_single_fits():
+    freq, psd = synthetic_spectra(2)
+    stacked_freq, stacked_psd = power_law.stack_bands([freq, freq[:200]], [psd[0], psd[1, :200]])
+    stacked = power_law.fit_power_law(stacked_freq, stacked_psd)
+    for i, (f, p) in enumerate([(freq, psd[0]), (freq[:200], psd[1, :200])]):
+        single = power_law.fit_power_law(f, p)
+        assert np.allclose([values[i] for values in stacked], single)
+
+
+def test_nonlinear_mode():
+    freq, psd = synthetic_spectra(3)
+    slope, slope_error, prefactor, _prefactor_error = power_law.fit_power_law(freq, psd, method="nonlinear")
+    assert slope.shape == (3,)
+    assert np.all(np.abs(slope + 2.3) < 4 * slope_error)
+    fixed_prefactor, _error = power_law.fit_power_law_prefactor(freq, psd, slope=slope, method="nonlinear")
+    assert np.allclose(fixed_prefactor, prefactor, rtol=1e-4)
+
+
+def test_integrate_power_law_in_closed_form():
+    freq = np.linspace(7, 40, 200001)
+    for slope in [-2.5, -1, -1 + 1e-9, -0.5]:
+        numerical = np.trapezoid(3 * freq ** slope, freq)
+        assert np.isclose(power_law.integrate_power_law(3, slope, a=7, b=40), numerical, rtol=1e-8)
+    assert np.isclose(power_law.integrate_power_law(3, -1, a=7, b=40), 3 * np.log(40 / 7))
+
+    # broadcast over error bounds (rows) and instruments (columns)
+    slopes = np.array([[-2.0, -1.5], [-1.0, -1.0]])
+    energies = power_law.integrate_power_law(1.0, slopes, a=[7, 8], b=[30, 40])
+    assert energies.shape == (2, 2)
+    assert np.isclose(energies[0, 1], 2 * (8 ** -0.5 - 40 ** -0.5))
+    assert np.isclose(energies[1, 0], np.log(30 / 7))
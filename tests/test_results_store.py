@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+
+import src.results_store as results_store
+
+
+@pytest.fixture
+def table(tmp_path):
+    records = np.zeros(4, dtype=[("lon", "f8"), ("mab", "i8"), ("E", "f8"), ("depth", "i8")])
+    records["lon"] = [-51.64, -51.64, -50.81, -50.09]
+    records["mab"] = [100, 400, 50, 800]
+    records["E"] = [1e-4, 2e-4, 3e-4, 4e-4]
+    records["depth"] = [1400, 1100, 2493, 2000]
+    path = tmp_path / "results"
+    results_store.write_results(path, records, units={"lon": "degree_east", "mab": "m", "E": "m^2/s^2", "depth": "m"})
+    return path, records
+
+
+def test_roundtrip_without_pickle(table):
+    path, records = table
+    schema = json.loads((path / "schema.json").read_text())
+    assert schema["schema_version"] == results_store.SCHEMA_VERSION
+    assert schema["n_rows"] == 4
+    assert schema["columns"]["mab"]["dtype"] == "<i8"
+    assert results_store.read_units(path)["E"] == "m^2/s^2"
+
+    data = results_store.read_results(path)
+    assert list(data) == ["lon", "mab", "E", "depth"]
+    assert isinstance(data["E"], np.memmap)
+    for name in records.dtype.names:
+        assert np.array_equal(data[name], records[name])
+
+
+def test_column_selection_and_filters(table):
+    path, records = table
+    data = results_store.read_results(path, columns=["E"], filters=[("lon", "==", -51.64), ("mab", "<", 300)])
+    assert list(data) == ["E"]
+    assert np.array_equal(data["E"], [1e-4])
+    data = results_store.read_results(path, columns=["mab"], filters=[("lon", "in", [-50.81, -50.09])], mmap_mode=None)
+    assert np.array_equal(data["mab"], [50, 800])
+
+    with pytest.raises(KeyError):
+        results_store.read_results(path, columns=["eps"])
+    with pytest.raises(ValueError):
+        results_store.read_results(path, filters=[("mab", "~", 1)])
+
+
+def test_invalid_tables(tmp_path):
+    with pytest.raises(ValueError):
+        results_store.write_results(tmp_path, {"a": np.zeros(2)}, units={})
+    with pytest.raises(ValueError):
+        results_store.write_results(tmp_path, {"a": np.zeros(2), "b": np.zeros(3)}, units={"a": "", "b": ""})
+    with pytest.raises(TypeError):
+        results_store.write_results(tmp_path, {"a": np.array([None, 1])}, units={"a": ""})
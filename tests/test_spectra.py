@@ -0,0 +1,278 @@
+import numpy as np
+import pytest
+
+import src.spectra as spectra
+
+
+def synthetic_complex_velocity(N, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(N) / 12  # 2-hourly samples in days
+    tide = 0.05 * np.exp(2j * np.pi * 1.93 * t)
+    noise = 0.02 * (rng.standard_normal(N) + 1j * rng.standard_normal(N))
+    return tide + noise
+
+
+@pytest.mark.parametrize("N", [1000, 1001])
+def test_total_multitaper_matches_multitaper_package(N):
+    mt = pytest.importorskip("multitaper")
+    cv = synthetic_complex_velocity(N)
+
+    spec = mt.MTSpec(cv - np.mean(cv), nw=10, dt=1 / 12, iadapt=0, nfft=N)
+    S = np.ravel(spec.spec)
+    f = np.ravel(spec.freq)
+    n_pairs = (N - 1) // 2
+    expected_freq = f[f > 0][:n_pairs]
+    expected_psd = S[f < 0][::-1][:n_pairs] + S[f > 0][:n_pairs]
+
+    freq, total_psd = spectra.total_multitaper(cv, dt=1 / 12, P=10)
+    assert np.allclose(freq, expected_freq)
+    assert np.allclose(total_psd, expected_psd, rtol=1e-10, atol=0)
+
+
+def test_taper_bank_is_reused(tmp_path):
+    spectra.clear_taper_cache()
+    tapers, eigenvalues = spectra.get_dpss_tapers(500, NW=4, cache_dir=tmp_path)
+    assert tapers.shape == (7, 500)
+    assert not tapers.flags.writeable
+    assert spectra.get_dpss_tapers(500, NW=4, cache_dir=tmp_path)[0] is tapers
+
+    # after clearing the memory, the tapers are read from disk
+    spectra.clear_taper_cache()
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+    from_disk, _ = spectra.get_dpss_tapers(500, NW=4, cache_dir=tmp_path)
+    assert np.array_equal(from_disk, tapers)
+
+
+def test_mooring_total_multitaper_matches_single_series():
+    pd = pytest.importorskip("pandas")
+    N = 1200
+    columns = {
+        "time": pd.date_range("2020-01-01", periods=N, freq="2h"),
+        "500": synthetic_complex_velocity(N, seed=1),
+        "800": synthetic_complex_velocity(N, seed=2),
+        "1200": np.concatenate([synthetic_complex_velocity(N - 201, seed=3), np.full(201, np.nan)]),
+    }
+    mooring = pd.DataFrame(columns)
+
+    batched = spectra.mooring_total_multitaper(mooring, dt=1 / 12, P=10)
+    assert list(batched.keys()) == ["500", "800", "1200"]
+    for column, (freq, total_psd) in batched.items():
+        series = mooring[column].to_numpy()
+        expected_freq, expected_psd = spectra.total_multitaper(series[~np.isnan(series)], dt=1 / 12, P=10)
+        assert np.allclose(freq, expected_freq)
+        assert np.allclose(total_psd, expected_psd, rtol=1e-12, atol=0)
+
+
+def test_spectrum_cache_computes_each_spectrum_once(tmp_path, monkeypatch):
+    from src.location import Location
+    from src.spectrum_cache import SpectrumCache
+
+    cv = synthetic_complex_velocity(800)
+    location = Location(lat=-63.5, lon=-51.6)
+    cache = SpectrumCache(cache_dir=tmp_path)
+    freq, total_psd = cache.total_multitaper(cv, location=location, depth="1513")
+
+    # a new cache with the same directory must not recompute the spectrum
+    def fail(*args, **kwargs):
+        raise AssertionError("spectrum was recomputed")
+
+    monkeypatch.setattr(spectra, "total_multitaper", fail)
+    cached_freq, cached_psd = SpectrumCache(cache_dir=tmp_path).total_multitaper(cv, location=location, depth="1513")
+    assert np.array_equal(cached_freq, freq)
+    assert np.array_equal(cached_psd, total_psd)
+
+    # changed data is a different key
+    with pytest.raises(AssertionError, match="recomputed"):
+        cache.total_multitaper(cv * 2, location=location, depth="1513")
+
+
+def test_adaptive_multitaper_degrees_of_freedom():
+    mt = pytest.importorskip("multitaper")
+    block = np.stack([synthetic_complex_velocity(900, seed=seed) for seed in range(3)])
+
+    freq, psd, dof = spectra.adaptive_multitaper(block, dt=1 / 12, P=10, total=False)
+    assert psd.shape == dof.shape == block.shape
+    for series, series_psd, series_dof in zip(block, psd, dof):
+        spec = mt.MTSpec(series - np.mean(series), nw=10, dt=1 / 12, iadapt=0, nfft=len(series))
+        assert np.allclose(series_psd, np.ravel(spec.spec), rtol=1e-10, atol=0)
+        assert np.allclose(series_dof, np.ravel(spec.se), rtol=1e-6)
+
+    # the total PSD has at most the degrees of freedom of both sides together
+    _freq, total_psd, total_dof = spectra.adaptive_multitaper(block[0], dt=1 / 12, P=10)
+    assert total_psd.shape == total_dof.shape
+    assert np.all(total_dof <= 4 * 19 + 1e-9)
+
+
+def test_segmented_total_multitaper_from_memmap(tmp_path):
+    cv = synthetic_complex_velocity(3000)
+    path = tmp_path / "record.npy"
+    np.save(path, cv)
+
+    freq, total_psd, n_segments = spectra.segmented_total_multitaper(
+        path, segment_length=1000, dt=1 / 12, P=4, overlap=0.5, nfft=2000
+    )
+    assert n_segments == 5
+    assert len(freq) == len(total_psd) == 999
+    # the variance of the record is recovered by the averaged spectrum
+    assert np.isclose(np.sum(total_psd) * (freq[1] - freq[0]), np.var(cv), rtol=0.05)
+
+    # a single segment is the ordinary total PSD
+    _freq, single_psd, _n = spectra.segmented_total_multitaper(cv[:1000], segment_length=1000, P=4)
+    assert np.allclose(single_psd, spectra.total_multitaper(cv[:1000], P=4)[1])
+
+
+def test_power_spectrum_band_energies_match_integrate_psd_interval():
+    freq, total_psd = spectra.total_multitaper(synthetic_complex_velocity(1000))
+    spectrum = spectra.PowerSpectrum(freq, total_psd)
+
+    a = np.array([0.0, 0.5, 1.93, 1.5, 3.0, 5.9])
+    b = np.array([6.0, 1.2, 2.05, 2.5, 3.0, 1.0])
+    expected = [spectra.integrate_psd_interval(freq, total_psd, a=lower, b=upper) for lower, upper in zip(a, b)]
+    assert np.allclose(spectrum.integrate(a, b), expected, rtol=1e-12, atol=0)
+    assert np.isclose(spectrum.integrate(), spectra.integrate_psd_interval(freq, total_psd))
+
+    # exact edges integrate the whole band, for edges on the grid both are the trapezoidal integral
+    assert np.isclose(spectrum.integrate(freq[10], freq[20], edges="exact"), np.trapezoid(total_psd[10:21], freq[10:21]))
+    assert np.isclose(spectrum.integrate(edges="exact"), np.trapezoid(total_psd, freq))
+
+
+def test_confidence_interval_factors():
+    # reference values of the pdf grid integration in _multitaper.mconf for K = 19, gamma = 0.95
+    assert np.allclose(spectra.confidence_interval_factors(19, 0.95, "lin"), (0.55655, 1.44345), atol=1e-4)
+    assert np.allclose(spectra.confidence_interval_factors(19, 0.95, "log"), (-0.208879, 0.185821), atol=1e-4)
+
+    # arrays of K and degrees of freedom give the same factors as the scalar calls
+    ra, rb = spectra.confidence_interval_factors(np.array([[9, 19], [19, 9]]), 0.95, "lin")
+    assert ra.shape == (2, 2)
+    assert np.isclose(ra[0, 1], spectra.confidence_interval_factors(19, 0.95, "lin")[0])
+    ra_dof, rb_dof = spectra.confidence_interval_factors(dof=np.array([18.0, 38.0]), gamma=0.95)
+    assert np.allclose(ra_dof, [ra[0, 0], ra[0, 1]])
+
+
+def test_confidence_interval_factors_are_memorized(monkeypatch):
+    dof = np.array([17.3, 18.0, 17.3, 38.0])
+    expected = spectra.confidence_interval_factors(dof=dof, gamma=0.9)
+
+    solved = []
+    symmetric_interval_half_width = spectra._symmetric_interval_half_width
+
+    def counting_half_width(K, gamma, scale):
+        solved.extend(np.atleast_1d(K).tolist())
+        return symmetric_interval_half_width(K, gamma, scale)
+
+    monkeypatch.setattr(spectra, "_symmetric_interval_half_width", counting_half_width)
+    # only the new value is solved, the repeated ones come from the memory
+    ra, rb = spectra.confidence_interval_factors(dof=np.append(dof, 50.0), gamma=0.9)
+    assert solved == [25.0]
+    assert np.array_equal(ra[:-1], expected[0]) and np.array_equal(rb[:-1], expected[1])
+    assert spectra.confidence_interval_factors(9.0, gamma=0.9) == (ra[1], rb[1])
+    assert solved == [25.0]
+
+    for gamma in (0, 1, 1.5, np.nan):
+        with pytest.raises(ValueError):
+            spectra.confidence_interval_factors(19, gamma)
+
+
+def test_rotary_multitaper_splits_the_total_psd():
+    N = 1000
+    t = np.arange(N) / 12
+    # clockwise rotation at 1.8 cpd, counterclockwise at 3 cpd
+    cv = 0.05 * np.exp(-2j * np.pi * 1.8 * t) + 0.01 * np.exp(2j * np.pi * 3 * t) + synthetic_complex_velocity(N) / 10
+
+    freq, total_psd, cw, ccw, coefficient = spectra.rotary_multitaper(cv, rotary_coefficient=True)
+    expected_freq, expected_total_psd = spectra.total_multitaper(cv)
+    assert np.allclose(freq, expected_freq)
+    assert np.allclose(total_psd, expected_total_psd, rtol=1e-12, atol=0)
+    assert coefficient[np.argmin(np.abs(freq - 1.8))] > 0.9
+    assert coefficient[np.argmin(np.abs(freq - 3))] < -0.9
+
+
+def test_multitaper_spectrogram_band_energies():
+    cv = synthetic_complex_velocity(3000)
+    # the semidiurnal tide is switched off in the second half
+    t = np.arange(3000) / 12
+    cv[1500:] -= 0.05 * np.exp(2j * np.pi * 1.93 * t[1500:])
+    cv[2000] = np.nan
+
+    window_time, freq, spectrogram = spectra.multitaper_spectrogram(cv, window_length=500, step=250, P=4)
+    assert spectrogram.shape == (11, 249)
+    assert np.array_equal(window_time, np.arange(11) * 250 + 250)
+    # windows with NaNs are left empty
+    assert np.all(np.isnan(spectrogram[[7, 8]]))
+    assert np.allclose(spectrogram[0], spectra.total_multitaper(cv[:500], P=4)[1])
+
+    band_energies = spectra.spectrogram_band_energies(
+        freq, spectrogram, bands={"semidiurnal": (1.8, 2.1), "peaks": ([1.8, 2.5], [2.1, 3.0])}
+    )
+    semidiurnal = band_energies["semidiurnal"]
+    assert semidiurnal.shape == (11,)
+    assert np.isclose(semidiurnal[0], spectra.integrate_psd_interval(freq, spectrogram[0], a=1.8, b=2.1))
+    assert semidiurnal[0] > 10 * semidiurnal[-1]
+    assert np.all(band_energies["peaks"][:5] > semidiurnal[:5])
+
+
+def test_single_precision_matches_double_precision():
+    pd = pytest.importorskip("pandas")
+    from src.mooring import Mooring
+
+    # one year of 2-hourly data
+    N = 12 * 365
+    cv = synthetic_complex_velocity(N)
+    freq, double_psd = spectra.total_multitaper(cv)
+    single_freq, single_psd = spectra.total_multitaper(cv, precision="single")
+    assert single_psd.dtype == np.float32
+    assert np.allclose(single_freq, freq)
+    assert np.allclose(single_psd, double_psd, rtol=1e-4, atol=0)
+    double_energy = spectra.integrate_psd_interval(freq, double_psd, a=0.9, b=3)
+    assert np.isclose(spectra.integrate_psd_interval(freq, single_psd, a=0.9, b=3), double_energy, rtol=1e-6)
+
+    mooring = Mooring({"time": pd.date_range("2020-01-01", periods=N, freq="2h"), "500": cv})
+    mooring.location = "somewhere"
+    single_mooring = mooring.with_precision("single")
+    assert single_mooring["500"].dtype == np.complex64
+    assert single_mooring.location == "somewhere"
+    batched = spectra.mooring_total_multitaper(single_mooring, precision="single")
+    assert np.allclose(batched["500"][1], double_psd, rtol=1e-4, atol=0)
+
+    with pytest.raises(ValueError):
+        spectra.total_multitaper(cv, precision="half")
+
+
+def test_mooring_cross_spectra():
+    pd = pytest.importorskip("pandas")
+    N = 1500
+    shared = synthetic_complex_velocity(N, seed=1)
+    columns = {
+        "time": pd.date_range("2020-01-01", periods=N, freq="2h"),
+        "500": shared,
+        "800": 0.5 * shared * np.exp(1j * np.pi / 4),
+        "1200": np.concatenate([synthetic_complex_velocity(N - 100, seed=3), np.full(100, np.nan)]),
+    }
+    names, freq, cross_spectra, coherence, phase = spectra.mooring_cross_spectra(pd.DataFrame(columns), P=4)
+    assert names == ["500", "800", "1200"]
+    assert cross_spectra.shape == (3, 3, N - 100)
+    assert np.all(np.diff(freq) > 0)
+    # Hermitian, and the diagonal recovers the variance of each (cut) series
+    assert np.allclose(cross_spectra, np.conj(np.swapaxes(cross_spectra, 0, 1)))
+    df = freq[1] - freq[0]
+    assert np.isclose(np.sum(cross_spectra[0, 0].real) * df, np.var(shared[:N - 100]), rtol=1e-2)
+    # pairs are identical to the pairwise computation
+    _freq, pair = spectra.cross_spectral_matrix(np.stack([shared[:N - 100], columns["1200"][:N - 100]]), P=4)
+    assert np.allclose(pair[0, 1], cross_spectra[0, 2])
+
+    assert np.allclose(coherence[0, 1], 1)
+    assert np.allclose(phase[1, 0], np.pi / 4)
+    assert np.median(coherence[0, 2]) < 0.5
+
+
+def test_tidal_peak_intervals_are_merged_and_memorized():
+    freq = np.arange(1, 501) / 250 * 6
+    # periods in hours, the first two peaks overlap, the third one only touches the merged peak
+    periods = [24 / freq[100], 24 / freq[103], 24 / freq[110], 24 / freq[200]]
+    intervals = spectra.tidal_peak_intervals(freq, P=3, tidal_periods=periods)
+    assert intervals.tolist() == [[97, 114], [197, 204]]
+    assert not intervals.flags.writeable
+
+    # the same grid and constituents in any order return the memorized result
+    assert spectra.tidal_peak_intervals(freq.copy(), P=3, tidal_periods=periods[::-1]) is intervals
+    assert spectra.tidal_peak_intervals(freq, P=4, tidal_periods=periods).tolist() == [[96, 115], [196, 205]]
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.stratification import StratificationIndex, location_key
+
+
+@pytest.fixture
+def tables():
+    mab = np.arange(0, 500)
+    locations = [(-63.51, -51.64), (-63.66, -50.81)]
+    N_table = pd.DataFrame({"mab": mab})
+    N_error_table = pd.DataFrame({"mab": mab})
+    for i, (lat, lon) in enumerate(locations):
+        N_table[location_key(lat, lon)] = 1e-3 * (i + 1) + 1e-6 * mab
+        N_error_table[location_key(lat, lon)] = 1e-4 * (i + 1) + 0 * mab
+    return N_table, N_error_table
+
+
+def test_lookup_matches_table_scan(tables):
+    N_table, N_error_table = tables
+    index = StratificationIndex(N_table, N_error_table)
+    lat = np.array([-63.51, -63.66, -63.51])
+    lon = np.array([-51.64, -50.81, -51.64])
+    mab = np.array([0, 123, 499])
+
+    expected = [
+        N_table.loc[N_table["mab"] == m, location_key(la, lo)].item()
+        for la, lo, m in zip(lat, lon, mab)
+    ]
+    assert np.array_equal(index.lookup(lat, lon, mab), expected)
+    assert np.allclose(index.lookup_error(lat, lon, mab), [1e-4, 2e-4, 1e-4])
+    # one location and many mab values
+    assert np.array_equal(index.lookup(-63.66, -50.81, np.arange(500)), N_table[location_key(-63.66, -50.81)])
+
+
+def test_missing_values(tables):
+    N_table, _N_error_table = tables
+    index = StratificationIndex(N_table)
+    assert not index.has_errors
+    with pytest.raises(KeyError):
+        index.lookup(-63.51, -51.64, 500)
+    N = index.lookup([-63.51, -60.0, -63.51], [-51.64, -50.0, -51.64], [10, 10, 600], missing="nan")
+    assert np.isclose(N[0], 1e-3 + 1e-5)
+    assert np.all(np.isnan(N[1:]))
@@ -0,0 +1,74 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import equations as eq
+import src.helper as helper
+from transect_dissipation import interpolate_energy_field, transect_dissipation
+
+
+def test_interpolate_energy_field():
+    # a single instrument mooring at -51 and a mooring with two instruments at -50
+    lon, mab, energy = [-50, -51, -50], [300, 100, 50], [4.0, 1.0, 2.0]
+    grid_lons = [-51.5, -51, -50.5, -50, -49.5]
+    grid_mab = [0, 50, 100, 200, 300, 400]
+    field = interpolate_energy_field(lon, mab, energy, grid_lons, grid_mab)
+
+    nan = np.nan
+    expected = np.array([
+        # constant below the deepest instrument, NaN above the shallowest and outside the moorings
+        [nan, 1.0, 1.5, 2.0, nan],
+        [nan, 1.0, 1.5, 2.0, nan],
+        [nan, 1.0, 1.7, 2.4, nan],
+        [nan, nan, nan, 3.2, nan],
+        [nan, nan, nan, 4.0, nan],
+        [nan, nan, nan, nan, nan],
+    ])
+    assert np.allclose(field, expected, equal_nan=True)
+
+    # a single mooring only fills its own grid column
+    single = interpolate_energy_field([-51], [100], [1.0], grid_lons, grid_mab)
+    assert np.allclose(single, np.where(np.array(grid_lons) == -51, expected[:, 1:2], np.nan), equal_nan=True)
+
+
+def test_transect_dissipation():
+    bins = ["-51.5", "-51.0", "-50.5"]
+    lat = np.array([-63.5, -63.6, -63.7])
+    f = np.abs(helper.Constants.get_coriolis_frequency(lat, unit="rad/s"))
+    N = pd.DataFrame(
+        [[2 * f[0], 1e-3, np.nan],
+         [0.5 * f[0], f[1], 3 * f[2]]],
+        index=[0, 1], columns=bins,
+    )
+    N_error = pd.DataFrame(1e-5, index=N.index, columns=bins)
+    energy = np.array([[1e-4, 2e-4, 3e-4], [1e-4, 2e-4, np.nan]])
+    energy_error = 0.1 * energy
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        eps, mult_error, add_error = transect_dissipation(energy, energy_error, N, N_error, lat)
+
+    assert eps.index.equals(N.index) and eps.columns.equals(N.columns)
+    # NaN without N or energy and where N <= |f|
+    is_valid = np.array([[True, True, False], [False, False, False]])
+    for result in (eps, mult_error, add_error):
+        assert np.array_equal(np.isfinite(result.to_numpy()), is_valid)
+    with np.errstate(invalid="ignore"):
+        expected = eq.get_dissipation_rate(-f[None, :], N.to_numpy(), energy)
+    assert np.allclose(eps.to_numpy()[is_valid], expected[is_valid], rtol=1e-13, atol=0)
+
+
+def test_transect_dissipation_of_arrays():
+    lat = np.array([-63.5, -63.6])
+    f = np.abs(helper.Constants.get_coriolis_frequency(lat, unit="rad/s"))
+    N = np.array([[2 * f[0], 0.5 * f[1]], [1e-3, 3 * f[1]]])
+    energy = np.full((2, 2), 1e-4)
+    arguments = dict(energy=energy, energy_error=0.1 * energy, N_error=np.full((2, 2), 1e-5), lat=lat)
+
+    results = transect_dissipation(N=N, **arguments)
+    frames = transect_dissipation(N=pd.DataFrame(N), **arguments)
+    for result, frame in zip(results, frames):
+        assert isinstance(result, np.ndarray) and result.shape == (2, 2)
+        assert np.array_equal(result, frame.to_numpy(), equal_nan=True)
+    assert np.isnan(results[0][0, 1]) and np.all(np.isfinite(results[0][:, 0]))